@@ -1,22 +1,16 @@
-import csv
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from jinja2 import Template
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from collections import Counter
+from marks_stream import BIN_EDGES, aggregate, iter_rows
+import marks_snapshot
 
-def main():
-    try:
-      if sys.argv[1] == "-s":
-          student_id = sys.argv[2].strip()
-          data = []
-          with open("data.csv", "r") as f:
-              data = list(csv.reader(f))
-              data.pop(0)
-              data = [i for i in data if i[0] == student_id]
-              total = sum(int(i[2]) for i in data)
-          if len(data) == 0:
-              raise ValueError("Student ID not found")
-          t = """
+# Templates are compiled once at import, so every report (and every worker
+# process in batch mode) reuses the same compiled template.
+STUDENT_TEMPLATE = Template("""
   <!DOCTYPE html>
   <html>
     <head>
@@ -41,7 +35,7 @@ def main():
           </th>
         </tr>
         {% for i in data %}
-        <tr> 
+        <tr>
           <td>{{i[0]}}</td>
           <td>{{i[1]}}</td>
           <td>{{i[2]}}</td>
@@ -54,22 +48,9 @@ def main():
       </table>
     </body>
   </html>
-  """
-          with open("output.html", "w") as f:
-              f.write(Template(t).render(data=data, total=total))
-              
-      elif sys.argv[1] == "-c":
-          course_id = sys.argv[2].strip()
-          marks = []
-          with open("data.csv", "r") as f:
-              data = list(csv.reader(f))
-              data.pop(0)
-              marks = [int(i[2]) for i in data if int(i[1]) == int(course_id)]
-          if len(marks) == 0:
-              raise ValueError("Course ID not found")
-          avg = sum(marks) / len(marks)
-          maxi = max(marks)
-          t = """
+  """)
+
+COURSE_TEMPLATE = Template("""
   <!DOCTYPE html>
   <html>
     <head>
@@ -89,25 +70,19 @@ def main():
           <th>
             Maximum Marks
           </th>
-        </tr> 
+        </tr>
         <tr>
           <td>{{avg}}</td>
           <td>{{maxi}}</td>
         </tr>
       </table>
       <br>
-      <img src="image.jpg">
+      <img src="{{image}}">
     </body>
   </html>
-  """
-          plt.hist(marks)
-          plt.xlabel('Marks')
-          plt.ylabel('Frequency')
-          plt.savefig('image.jpg')
-          with open("output.html", "w") as f:
-              f.write(Template(t).render(avg=avg, maxi=maxi))
-    except ValueError:
-        t = """
+  """)
+
+ERROR_TEMPLATE = Template("""
   <!DOCTYPE html>
   <html>
     <head>
@@ -124,9 +99,109 @@ def main():
       </p>
     </body>
   </html>
-  """
+  """)
+
+# One pass over data.csv.  Student reports list every row, so rows are
+# grouped per requested student; courses only keep streaming aggregates.
+def load_marks(student_ids=None):
+    wanted = None if student_ids is None else set(student_ids)
+    students = {}
+    for row in iter_rows("data.csv"):
+        if wanted is None or row[0] in wanted:
+            students.setdefault(row[0], []).append(row)
+    return students
+
+def write_student_report(out_dir, student_id, data):
+    path = os.path.join(out_dir, "student_%s.html" % student_id)
+    with open(path, "w") as f:
+        if data:
+            total = sum(int(i[2]) for i in data)
+            f.write(STUDENT_TEMPLATE.render(data=data, total=total))
+        else:
+            f.write(ERROR_TEMPLATE.render())
+    return path
+
+def write_course_report(out_dir, course_id, course):
+    path = os.path.join(out_dir, "course_%s.html" % course_id)
+    with open(path, "w") as f:
+        if course:
+            image = "course_%s.jpg" % course_id
+            # Object API instead of pyplot: each figure is independent of the others
+            fig = Figure()
+            ax = fig.add_subplot()
+            ax.hist(BIN_EDGES[:-1], bins=BIN_EDGES, weights=course.bins)
+            ax.set_xlabel('Marks')
+            ax.set_ylabel('Frequency')
+            fig.savefig(os.path.join(out_dir, image))
+            f.write(COURSE_TEMPLATE.render(avg=course.avg, maxi=course.maxi, image=image))
+        else:
+            f.write(ERROR_TEMPLATE.render())
+    return path
+
+# Writes one report per student and per course into out_dir, spreading the
+# rendering over a process pool.  student_ids/course_ids of None mean "all".
+def batch(out_dir, student_ids=None, course_ids=None):
+    students = load_marks(student_ids) if student_ids != [] else {}
+    courses = aggregate("data.csv")[1] if course_ids != [] else {}
+    if student_ids is None:
+        student_ids = list(students)
+    if course_ids is None:
+        course_ids = list(courses)
+    os.makedirs(out_dir, exist_ok=True)
+    with ProcessPoolExecutor() as pool:
+        jobs = [pool.submit(write_student_report, out_dir, i, students.get(i))
+                for i in student_ids]
+        jobs += [pool.submit(write_course_report, out_dir, i, courses.get(i))
+                 for i in course_ids]
+        for job in jobs:
+            print(job.result())
+
+def main():
+    try:
+      if sys.argv[1] == "-compile":
+          print(marks_snapshot.compile_snapshot("data.csv"))
+
+      elif sys.argv[1] == "-all":
+          out_dir = sys.argv[2] if len(sys.argv) > 2 else "reports"
+          batch(out_dir)
+
+      elif sys.argv[1] == "-sl":
+          student_ids = [i.strip() for i in sys.argv[2].split(",") if i.strip()]
+          out_dir = sys.argv[3] if len(sys.argv) > 3 else "reports"
+          batch(out_dir, student_ids=student_ids, course_ids=[])
+
+      elif sys.argv[1] == "-cl":
+          course_ids = [int(i) for i in sys.argv[2].split(",") if i.strip()]
+          out_dir = sys.argv[3] if len(sys.argv) > 3 else "reports"
+          batch(out_dir, student_ids=[], course_ids=course_ids)
+
+      elif sys.argv[1] == "-s":
+          student_id = sys.argv[2].strip()
+          rows = marks_snapshot.load("data.csv").student_rows(student_id)
+          if rows is None:
+              raise ValueError("Student ID not found")
+          data = rows.tolist()
+          total = int(rows[:, 2].sum())
+          with open("output.html", "w") as f:
+              f.write(STUDENT_TEMPLATE.render(data=data, total=total))
+
+      elif sys.argv[1] == "-c":
+          course_id = sys.argv[2].strip()
+          rows = marks_snapshot.load("data.csv").course_rows(course_id)
+          if rows is None:
+              raise ValueError("Course ID not found")
+          course = marks_snapshot.summarize(rows[:, 2])
+          avg = course.avg
+          maxi = course.maxi
+          plt.hist(BIN_EDGES[:-1], bins=BIN_EDGES, weights=course.bins)
+          plt.xlabel('Marks')
+          plt.ylabel('Frequency')
+          plt.savefig('image.jpg')
+          with open("output.html", "w") as f:
+              f.write(COURSE_TEMPLATE.render(avg=avg, maxi=maxi, image="image.jpg"))
+    except ValueError:
         with open("output.html", "w") as f:
-              f.write(Template(t).render())
+              f.write(ERROR_TEMPLATE.render())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
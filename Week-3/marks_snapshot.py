@@ -0,0 +1,144 @@
+import os
+import shutil
+import threading
+from array import array
+
+import numpy as np
+
+from marks_stream import BIN_EDGES, BIN_WIDTH, MARK_MAX, MARK_MIN, Aggregate, iter_rows
+
+# Compiled columnar snapshot of a marks CSV.
+#
+# The CSV is parsed once into int64 columns (student id, course id, marks),
+# stored twice: sorted by student and sorted by course.  Each ordering has a
+# small index of the distinct ids and the offset where each id's rows start.
+# Every array is a plain .npy file, so loading is an np.load(mmap_mode='r')
+# and a query is a binary search on the index followed by a slice.
+#
+# Snapshots live in <csv>.snapshot/<mtime_ns>_<size>/, so a newer CSV simply
+# maps to a directory that does not exist yet and gets compiled on demand.
+
+ARRAYS = ("by_student", "student_ids", "student_offsets",
+          "by_course", "course_ids", "course_offsets")
+
+
+def snapshot_dir(csv_path):
+    st = os.stat(csv_path)
+    return os.path.join(csv_path + ".snapshot", "%d_%d" % (st.st_mtime_ns, st.st_size))
+
+
+def _index(keys):
+    ids, starts = np.unique(keys, return_index=True)
+    offsets = np.append(starts, len(keys)).astype(np.int64)
+    return ids, offsets
+
+
+def compile_snapshot(csv_path):
+    target = snapshot_dir(csv_path)
+    if os.path.isdir(target):
+        return target
+
+    columns = array("q")
+    for row in iter_rows(csv_path):
+        columns.extend((int(row[0]), int(row[1]), int(row[2])))
+    rows = np.frombuffer(columns, dtype=np.int64).reshape(-1, 3)
+
+    # Stable sorts keep each id's rows in file order
+    by_student = rows[np.argsort(rows[:, 0], kind="stable")]
+    by_course = rows[np.argsort(rows[:, 1], kind="stable")]
+    student_ids, student_offsets = _index(by_student[:, 0])
+    course_ids, course_offsets = _index(by_course[:, 1])
+    arrays = {
+        "by_student": by_student, "student_ids": student_ids, "student_offsets": student_offsets,
+        "by_course": by_course, "course_ids": course_ids, "course_offsets": course_offsets,
+    }
+
+    # Build in a private directory and rename it into place, so a reader
+    # never sees a half-written snapshot
+    tmp = "%s.%d.%d.tmp" % (target, os.getpid(), threading.get_ident())
+    os.makedirs(tmp)
+    for name, value in arrays.items():
+        np.save(os.path.join(tmp, name + ".npy"), value)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Another process compiled the same snapshot first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for name in os.listdir(os.path.dirname(target)):
+        old = os.path.join(os.path.dirname(target), name)
+        if old != target and not name.endswith(".tmp"):
+            shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+class Snapshot:
+    def __init__(self, directory):
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, name + ".npy"), mmap_mode="r"))
+
+    @staticmethod
+    def _slice(rows, ids, offsets, key):
+        i = np.searchsorted(ids, key)
+        if i == len(ids) or ids[i] != key:
+            return None
+        return rows[offsets[i]:offsets[i + 1]]
+
+    # (n, 3) array of [student id, course id, marks], or None
+    def student_rows(self, student_id):
+        return self._slice(self.by_student, self.student_ids, self.student_offsets, int(student_id))
+
+    # (n, 3) array of [student id, course id, marks], or None
+    def course_rows(self, course_id):
+        return self._slice(self.by_course, self.course_ids, self.course_offsets, int(course_id))
+
+
+def summarize(marks):
+    agg = Aggregate()
+    marks = np.asarray(marks, dtype=np.int64)
+    agg.total = int(marks.sum())
+    agg.count = len(marks)
+    agg.maxi = int(marks.max())
+    # Same binning as marks_stream.bin_index
+    index = (np.clip(marks, MARK_MIN, MARK_MAX) - MARK_MIN) // BIN_WIDTH
+    index = np.minimum(index, len(BIN_EDGES) - 2)
+    agg.bins = np.bincount(index, minlength=len(BIN_EDGES) - 1).tolist()
+    return agg
+
+
+def load(csv_path):
+    return Snapshot(compile_snapshot(csv_path))
+
+
+class SnapshotStore:
+    # Same interface as marks_store.MarksStore, backed by a snapshot that is
+    # recompiled whenever the CSV changes.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dir = None
+        self._snapshot = None
+
+    def refresh(self):
+        directory = snapshot_dir(self.path)
+        if directory != self._dir:
+            with self._lock:
+                if directory != self._dir:
+                    self._snapshot = load(self.path)
+                    self._dir = directory
+        return self._snapshot
+
+    # Returns (rows, total) for a student, or None if the id is unknown
+    def student(self, student_id):
+        rows = self.refresh().student_rows(student_id)
+        if rows is None:
+            return None
+        return rows.tolist(), int(rows[:, 2].sum())
+
+    # Returns an Aggregate for the course, or None if the id is unknown
+    def course(self, course_id):
+        rows = self.refresh().course_rows(course_id)
+        if rows is None:
+            return None
+        return summarize(rows[:, 2])
@@ -1,8 +1,22 @@
-from flask import Flask, render_template, request
-import csv
-import matplotlib.pyplot as plt
+import os
+from flask import Flask, jsonify, render_template, request
+from marks_store import MarksStore
+from marks_snapshot import SnapshotStore
+from charts import ChartCache
+from marks_stats import MarksStats
+from static_assets import init_static_assets
 
 app = Flask(__name__)
+# Fingerprinted, pre-compressed static files from tools/build_assets.py
+init_static_assets(app)
+# MARKS_STORE=snapshot (default) answers queries from a compiled, memory-mapped
+# columnar snapshot; MARKS_STORE=memory keeps the parsed CSV in dicts instead.
+if os.environ.get("MARKS_STORE", "snapshot") == "memory":
+    store = MarksStore("data.csv", keep_rows=os.environ.get("MARKS_KEEP_ROWS", "1") != "0")
+else:
+    store = SnapshotStore("data.csv")
+charts = ChartCache(os.path.join("static", "charts"))
+stats = MarksStats("data.csv")
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -12,36 +26,23 @@ def index():
         if request.form["ID"] == "student_id":
             try:
                 student_id = request.form["id_value"]
-                data = []
-                with open("data.csv", "r") as f:
-                    data = list(csv.reader(f))
-                    data.pop(0)
-                    data = [i for i in data if i[0] == student_id]
-                    total = sum(int(i[2]) for i in data)
-                if len(data) == 0:
+                entry = store.student(student_id)
+                if entry is None:
                     raise ValueError("Student ID not found")
                 else:
+                    data, total = entry
                     return render_template("student_details.html", data=data, total=total)
             except ValueError:
                 return render_template("error.html")
         elif request.form["ID"] == "course_id":
             try:
                 course_id = request.form["id_value"]
-                marks = []
-                with open("data.csv", "r") as f:
-                    data = list(csv.reader(f))
-                    data.pop(0)
-                    marks = [int(i[2]) for i in data if int(i[1]) == int(course_id)]
-                if len(marks) == 0:
+                entry = store.course(course_id)
+                if entry is None:
                     raise ValueError("Course ID not found")
                 else:
-                    avg = sum(marks) / len(marks)
-                    maxi = max(marks)
-                    plt.hist(marks)
-                    plt.xlabel('Marks')
-                    plt.ylabel('Frequency')
-                    plt.savefig('static//image.jpg')
-                    return render_template("course_details.html", avg=avg, maxi=maxi)
+                    image = "charts/" + charts.histogram(entry.bins)
+                    return render_template("course_details.html", avg=entry.avg, maxi=entry.maxi, image=image)
             except ValueError:
                 return render_template("error.html")
         else:
@@ -49,6 +50,26 @@ def index():
     else:
         return render_template("error.html")
 
+# Marks statistics (see marks_stats.py): count, mean, median, std, min, max,
+# percentiles and grade-band counts
+@app.route('/api/course/stats')
+def all_course_stats():
+    return jsonify([dict(course_id=course_id, **entry) for course_id, entry in stats.courses.all()])
+
+@app.route('/api/course/<int:course_id>/stats')
+def course_stats(course_id):
+    entry = stats.courses.get(course_id)
+    if entry is None:
+        return jsonify({"message": "Course not found"}), 404
+    return jsonify(dict(course_id=course_id, **entry))
+
+@app.route('/api/student/<int:student_id>/stats')
+def student_stats(student_id):
+    entry = stats.students.get(student_id)
+    if entry is None:
+        return jsonify({"message": "Student not found"}), 404
+    return jsonify(dict(student_id=student_id, **entry))
+
 if __name__ == '__main__':
     app.debug = True
     app.run()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from matplotlib.figure import Figure
+
+from marks_stream import BIN_EDGES
+
+# Histograms are rendered with the object API on the Agg canvas, so no
+# pyplot global state is shared between requests.  Each image is named by a
+# hash of the bin counts it shows; once written it is served as-is until the
+# counts change.  static_assets.py serves these files as immutable, so bump
+# CHART_STYLE whenever _render() draws differently, which renames them all.
+
+CHART_STYLE = 1
+
+
+class ChartCache:
+    def __init__(self, directory, max_workers=2):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    @staticmethod
+    def _key(bins):
+        key = "%d:%s" % (CHART_STYLE, ",".join(map(str, bins)))
+        return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    def _render(self, bins, path):
+        fig = Figure()
+        ax = fig.add_subplot()
+        ax.hist(BIN_EDGES[:-1], bins=BIN_EDGES, weights=bins)
+        ax.set_xlabel('Marks')
+        ax.set_ylabel('Frequency')
+        # Write to a temporary name first so readers never see a partial file
+        tmp = "%s.%d.tmp" % (path, threading.get_ident())
+        fig.savefig(tmp, format="jpg")
+        os.replace(tmp, path)
+
+    def _done(self, name, future):
+        with self._lock:
+            self._pending.pop(name, None)
+
+    # Returns the file name of the histogram for these bin counts (see
+    # marks_stream.BIN_EDGES), rendering it in the worker pool if it is not
+    # cached yet.
+    def histogram(self, bins):
+        name = "hist_%s.jpg" % self._key(bins)
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            return name
+        submitted = False
+        with self._lock:
+            future = self._pending.get(name)
+            if future is None:
+                future = self._pool.submit(self._render, list(bins), path)
+                self._pending[name] = future
+                submitted = True
+        if submitted:
+            future.add_done_callback(lambda f: self._done(name, f))
+        future.result()
+        return name
@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+
+from marks_snapshot import Snapshot, compile_snapshot, snapshot_dir
+
+# Descriptive statistics of the marks of every course and every student.
+#
+# The snapshot (see marks_snapshot.py) already stores the rows sorted by
+# course and by student, with the offset where each id's rows start, so each
+# id's marks are a contiguous run.  All statistics are computed for every
+# run at once: sums and squared deviations with np.add.reduceat, order
+# statistics from one lexsort that sorts the marks within each run, and
+# grade bands from one bincount over (run, band) pairs.  Nothing loops over
+# ids in Python.
+#
+# MarksStats keeps the results until data.csv changes, which is when its
+# snapshot directory changes.
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# (grade, lowest mark), best first
+GRADE_BANDS = (("S", 90), ("A", 80), ("B", 70), ("C", 60), ("D", 50), ("E", 40), ("U", 0))
+
+_BAND_FLOORS = np.array([floor for _, floor in reversed(GRADE_BANDS)][1:])
+
+
+class GroupStats:
+    # Statistics of the runs marks[offsets[i]:offsets[i + 1]], one per id in
+    # the sorted array ids.
+
+    def __init__(self, ids, offsets, marks):
+        ids = np.asarray(ids)
+        offsets = np.asarray(offsets)
+        marks = np.asarray(marks, dtype=np.int64)
+        counts = np.diff(offsets)
+        starts = offsets[:-1]
+        run = np.repeat(np.arange(len(ids)), counts)
+
+        self.ids = ids
+        self.counts = counts
+        self.means = np.add.reduceat(marks, starts) / counts
+        deviations = marks - self.means[run]
+        self.stds = np.sqrt(np.add.reduceat(deviations * deviations, starts) / counts)
+
+        # Sort by mark within each run; runs stay where they are
+        ordered = marks[np.lexsort((marks, run))]
+        self.mins = ordered[starts]
+        self.maxs = ordered[offsets[1:] - 1]
+        # Linear interpolation between closest ranks, as np.percentile does
+        position = starts[:, None] + np.array(PERCENTILES) / 100 * (counts - 1)[:, None]
+        below = np.floor(position).astype(np.int64)
+        above = np.ceil(position).astype(np.int64)
+        self.percentiles = ordered[below] + (ordered[above] - ordered[below]) * (position - below)
+
+        band = len(GRADE_BANDS) - 1 - np.searchsorted(_BAND_FLOORS, marks, side="right")
+        self.bands = np.bincount(
+            run * len(GRADE_BANDS) + band, minlength=len(ids) * len(GRADE_BANDS)
+        ).reshape(len(ids), len(GRADE_BANDS))
+
+    def _entry(self, i):
+        percentiles = self.percentiles[i].tolist()
+        return {
+            "count": int(self.counts[i]),
+            "mean": float(self.means[i]),
+            "median": percentiles[PERCENTILES.index(50)],
+            "std": float(self.stds[i]),
+            "min": int(self.mins[i]),
+            "max": int(self.maxs[i]),
+            "percentiles": {str(p): value for p, value in zip(PERCENTILES, percentiles)},
+            "grade_bands": {grade: int(n) for (grade, _), n in zip(GRADE_BANDS, self.bands[i])},
+        }
+
+    # Statistics for one id, or None if it has no marks
+    def get(self, key):
+        i = np.searchsorted(self.ids, key)
+        if i == len(self.ids) or self.ids[i] != key:
+            return None
+        return self._entry(i)
+
+    # Statistics for every id, in id order
+    def all(self):
+        return [(int(key), self._entry(i)) for i, key in enumerate(self.ids)]
+
+
+class MarksStats:
+    # Per-course and per-student GroupStats of a marks CSV, recomputed when
+    # the CSV changes.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dir = None
+        self._stats = None
+
+    def refresh(self):
+        directory = snapshot_dir(self.path)
+        if directory != self._dir:
+            with self._lock:
+                if directory != self._dir:
+                    snapshot = Snapshot(compile_snapshot(self.path))
+                    self._stats = (
+                        GroupStats(snapshot.course_ids, snapshot.course_offsets, snapshot.by_course[:, 2]),
+                        GroupStats(snapshot.student_ids, snapshot.student_offsets, snapshot.by_student[:, 2]),
+                    )
+                    self._dir = directory
+        return self._stats
+
+    @property
+    def courses(self):
+        return self.refresh()[0]
+
+    @property
+    def students(self):
+        return self.refresh()[1]
@@ -0,0 +1,55 @@
+import os
+import threading
+
+from marks_stream import aggregate, student_rows
+
+
+class MarksStore:
+    # Keeps per-student and per-course aggregates of data.csv in memory and
+    # re-reads the file only when its mtime or size changes.
+    #
+    # With keep_rows=True the rows of each student are also indexed, in the
+    # same pass over the file, so the student page is a dict lookup.  Ids
+    # are looked up as integers, as SnapshotStore does.  For exports too large to hold in memory
+    # pass keep_rows=False: only the aggregates are kept and a student's rows
+    # are streamed from the file when asked for.
+
+    def __init__(self, path, keep_rows=True):
+        self.path = path
+        self.keep_rows = keep_rows
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._index = ({}, {}, {})
+
+    def _load(self):
+        rows = {}
+        students, courses = aggregate(self.path, rows if self.keep_rows else None)
+        # Swap all indexes in one assignment so readers never see a mix
+        self._index = (students, courses, rows)
+
+    def refresh(self):
+        st = os.stat(self.path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._load()
+                    self._stamp = stamp
+
+    # Returns (rows, total) for a student, or None if the id is unknown
+    def student(self, student_id):
+        student_id = int(student_id)
+        self.refresh()
+        students, courses, rows = self._index
+        agg = students.get(student_id)
+        if agg is None:
+            return None
+        if self.keep_rows:
+            return rows[student_id], agg.total
+        return list(student_rows(self.path, student_id)), agg.total
+
+    # Returns the Aggregate (total, count, maxi, bins, avg) for a course, or
+    # None if the id is unknown
+    def course(self, course_id):
+        self.refresh()
+        return self._index[1].get(int(course_id))
@@ -0,0 +1,95 @@
+import csv
+
+# Streaming aggregation over a marks CSV (student id, course id, marks).
+# Rows are read one at a time and folded into running totals, so memory
+# grows with the number of students and courses, never with the file size.
+
+# Histogram bins are fixed-width over 0-100 so they can be filled in a
+# single pass without knowing the minimum and maximum up front.  This
+# replaces the automatic min-to-max bins the charts used before, so a course
+# whose marks span 40-90 now shows empty bars below 40 rather than ten bars
+# spread over 40-90.  A mark outside 0-100 is clamped into the first or last
+# bin (see bin_index), so every row is counted in its course's histogram;
+# totals, averages and maxima use the mark as it is.
+MARK_MIN, MARK_MAX = 0, 100
+BIN_WIDTH = 10
+BIN_EDGES = list(range(MARK_MIN, MARK_MAX + 1, BIN_WIDTH))
+
+
+# Index of the bin that counts `mark`; 100 falls in the last bin, 90-100,
+# as it does for matplotlib
+def bin_index(mark):
+    mark = min(max(mark, MARK_MIN), MARK_MAX)
+    return min((mark - MARK_MIN) // BIN_WIDTH, len(BIN_EDGES) - 2)
+
+
+class Aggregate:
+    __slots__ = ("total", "count", "maxi", "bins")
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+        self.maxi = None
+        self.bins = [0] * (len(BIN_EDGES) - 1)
+
+    def add(self, mark):
+        self.total += mark
+        self.count += 1
+        if self.maxi is None or mark > self.maxi:
+            self.maxi = mark
+        self.bins[bin_index(mark)] += 1
+
+    @property
+    def avg(self):
+        return self.total / self.count
+
+
+# Yields the raw rows of the file, skipping the header and blank lines
+def iter_rows(path):
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row:
+                yield row
+
+
+# Ids are compared as integers, as marks_snapshot does, so " 1001" and
+# "1001" are the same student
+def student_rows(path, student_id):
+    student_id = int(student_id)
+    return (row for row in iter_rows(path) if int(row[0]) == student_id)
+
+
+# One pass over the file; returns ({student_id: Aggregate}, {course_id: Aggregate})
+# with int ids.  If `rows` is a dict, each student's raw rows are also
+# collected in it under the student id, in the same pass.
+def aggregate(path, rows=None):
+    students = {}
+    courses = {}
+    for row in iter_rows(path):
+        mark = int(row[2])
+        student_id = int(row[0])
+        student = students.get(student_id)
+        if student is None:
+            student = students[student_id] = Aggregate()
+        student.add(mark)
+        if rows is not None:
+            rows.setdefault(student_id, []).append(row)
+        course_id = int(row[1])
+        course = courses.get(course_id)
+        if course is None:
+            course = courses[course_id] = Aggregate()
+        course.add(mark)
+    return students, courses
+
+
+# One pass over the file for a single course; returns None if it has no rows
+def course_aggregate(path, course_id):
+    result = None
+    for row in iter_rows(path):
+        if int(row[1]) == course_id:
+            if result is None:
+                result = Aggregate()
+            result.add(int(row[2]))
+    return result
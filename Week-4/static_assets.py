@@ -0,0 +1,62 @@
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+# Serves the output of tools/build_assets.py.
+#
+# url_for('static', filename=...) returns the fingerprinted name from
+# static/dist/manifest.json when there is one, so templates keep using the
+# original names.  Files under dist/ change name whenever their content
+# changes, and so do the course histograms in charts/, which charts.py names
+# by a hash of the bin counts they show.  Both are sent with a one-year
+# immutable Cache-Control, so the browser never asks for them again.  A
+# pre-compressed .br or .gz variant is sent instead of the file when
+# Accept-Encoding allows it.
+#
+# Without a build (no manifest) everything else is served as before.
+
+IMMUTABLE_PREFIXES = ("dist/", "charts/")
+ONE_YEAR = 365 * 24 * 3600
+VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, "dist", "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def init_static_assets(app):
+    manifest = load_manifest(app.static_folder)
+
+    @app.url_defaults
+    def fingerprinted_url(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    def static(filename):
+        response = None
+        for encoding, suffix in VARIANTS:
+            path = safe_join(app.static_folder, filename + suffix)
+            if request.accept_encodings[encoding] and path and os.path.isfile(path):
+                response = send_from_directory(app.static_folder, filename + suffix,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers["Content-Encoding"] = encoding
+                break
+        if response is None:
+            response = send_from_directory(app.static_folder, filename)
+        response.vary.add("Accept-Encoding")
+        if filename.startswith(IMMUTABLE_PREFIXES):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = ONE_YEAR
+            response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static
+    return manifest
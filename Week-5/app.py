@@ -1,14 +1,36 @@
-from flask import Flask, render_template, redirect, url_for, request
+import os
+import time
+from flask import Flask, render_template, redirect, url_for, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import IntegrityError
+from catalog_cache import CatalogCache
+from sqlite_tuning import pragma_listener, sqlite_pragmas
 
 # Initialize the Flask application
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.sqlite3'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['PAGE_SIZE'] = 50
+app.config['MAX_PAGE_SIZE'] = 500
+app.config['COUNT_CACHE_SECONDS'] = 60
+# Course catalog cache; point CATALOG_CACHE_STAMP at a file shared by all
+# worker processes to keep their caches coherent
+app.config['CATALOG_CACHE_SECONDS'] = 300
+app.config['CATALOG_CACHE_STAMP'] = os.environ.get('CATALOG_CACHE_STAMP')
+
+# SQLite tuning, applied to every new connection (see sqlite_tuning.py)
+app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
 
 # Initialize the database
 db = SQLAlchemy(app)
 
+# Apply the SQLite settings above to every new connection
+apply_sqlite_pragmas = pragma_listener(app)
+
+with app.app_context():
+    event.listen(db.engine, 'connect', apply_sqlite_pragmas)
+
 # Define models
 class Student(db.Model):
     __tablename__ = 'student'
@@ -29,12 +51,99 @@ class Enrollment(db.Model):
     enrollment_id = db.Column(db.Integer, primary_key=True)
     estudent_id = db.Column(db.Integer, db.ForeignKey('student.student_id'), nullable=False)
     ecourse_id = db.Column(db.Integer, db.ForeignKey('course.course_id'), nullable=False)
+    __table_args__ = (
+        db.Index('uq_enrollments_student_course', 'estudent_id', 'ecourse_id', unique=True),
+        db.Index('ix_enrollments_course_student', 'ecourse_id', 'estudent_id'),
+    )
+
+# Keyset pagination: a page is "the next `size` rows with a primary key
+# greater than `after`", which is an index range scan however deep the page.
+def page_args():
+    after = request.args.get('after', 0, type=int)
+    size = request.args.get('size', app.config['PAGE_SIZE'], type=int)
+    size = max(1, min(size, app.config['MAX_PAGE_SIZE']))
+    return after, size
+
+def keyset_page(model, key, after, size):
+    rows = model.query.filter(key > after).order_by(key).limit(size + 1).all()
+    next_after = getattr(rows[size - 1], key.key) if len(rows) > size else None
+    return rows[:size], next_after
+
+# Row counts are cached for COUNT_CACHE_SECONDS and dropped on writes, so
+# listings do not run COUNT(*) on every request.
+_count_cache = {}
+
+def cached_count(model):
+    entry = _count_cache.get(model)
+    now = time.monotonic()
+    if entry is None or now - entry[1] > app.config['COUNT_CACHE_SECONDS']:
+        entry = (model.query.count(), now)
+        _count_cache[model] = entry
+    return entry[0]
+
+def invalidate_count(model):
+    _count_cache.pop(model, None)
+
+# Inserts rely on the UNIQUE and FOREIGN KEY constraints instead of a SELECT
+# first; this tells a duplicate from a missing parent row
+def is_unique_violation(error):
+    return 'UNIQUE constraint failed' in str(error.orig)
+
+# The course catalog as plain rows ordered by course_id, loaded once and
+# shared by every request. Courses are only written by init_db.py here, so
+# entries expire after CATALOG_CACHE_SECONDS; code that changes courses
+# should call catalog.invalidate() after committing.
+def load_catalog():
+    return db.session.execute(
+        select(Course.course_id, Course.course_code, Course.course_name, Course.course_description)
+        .order_by(Course.course_id)
+    ).all()
+
+catalog = CatalogCache(load_catalog, ttl=app.config['CATALOG_CACHE_SECONDS'],
+                       stamp=app.config['CATALOG_CACHE_STAMP'])
+
+# Apply only the difference between a student's current and requested
+# courses: one bulk DELETE for dropped courses, one executemany INSERT for new
+# ones, and no writes at all when the selection did not change.
+def sync_enrollments(student_id, course_ids):
+    wanted = {int(course_id) for course_id in course_ids}
+    current = {course_id for course_id, in db.session.query(Enrollment.ecourse_id).filter_by(estudent_id=student_id)}
+    dropped = current - wanted
+    added = wanted - current
+    if dropped:
+        Enrollment.query.filter(
+            Enrollment.estudent_id == student_id,
+            Enrollment.ecourse_id.in_(dropped),
+        ).delete(synchronize_session=False)
+    if added:
+        db.session.execute(insert(Enrollment), [
+            {'estudent_id': student_id, 'ecourse_id': course_id} for course_id in sorted(added)
+        ])
+    return added, dropped
 
 # Define routes
 @app.route('/')
 def index():
-    students = Student.query.all()
-    return render_template('index.html', students=students)
+    after, size = page_args()
+    start = request.args.get('start', 0, type=int)
+    students, next_after = keyset_page(Student, Student.student_id, after, size)
+    return render_template('index.html', students=students, next_after=next_after,
+                           size=size, start=start, total=cached_count(Student))
+
+@app.route('/api/students')
+def list_students():
+    after, size = page_args()
+    students, next_after = keyset_page(Student, Student.student_id, after, size)
+    return jsonify({
+        'students': [{
+            'student_id': s.student_id,
+            'roll_number': s.roll_number,
+            'first_name': s.first_name,
+            'last_name': s.last_name,
+        } for s in students],
+        'next_after': next_after,
+        'total': cached_count(Student),
+    })
 
 @app.route('/student/create', methods=['GET', 'POST'])
 def create_student():
@@ -42,27 +151,34 @@ def create_student():
         roll = request.form['roll']
         first_name = request.form['f_name']
         last_name = request.form['l_name']
-        courses_selected = request.form.getlist('courses')
-        
-        # Check for duplicate roll number
-        if Student.query.filter_by(roll_number=roll).first():
-            return render_template('error.html', message="Roll number already exists.")
-
-        # Add student to database
-        student = Student(roll_number=roll, first_name=first_name, last_name=last_name)
-        db.session.add(student)
-        db.session.flush()  # Flush to get student ID without committing
-
-        # Add enrollments
-        for course_id in courses_selected:
-            enrollment = Enrollment(estudent_id=student.student_id, ecourse_id=int(course_id))
-            db.session.add(enrollment)
-        
-        db.session.commit()
+        try:
+            course_ids = sorted({int(course_id) for course_id in request.form.getlist('courses')})
+        except ValueError:
+            return render_template('error.html', message="Unknown course."), 400
+
+        try:
+            # Add student to database; the UNIQUE roll_number rejects duplicates
+            student_id = db.session.execute(
+                insert(Student).values(roll_number=roll, first_name=first_name, last_name=last_name)
+                .returning(Student.student_id)
+            ).scalar_one()
+
+            # Add enrollments in one executemany; the course foreign key
+            # rejects ids that do not exist
+            if course_ids:
+                db.session.execute(insert(Enrollment), [
+                    {'estudent_id': student_id, 'ecourse_id': course_id} for course_id in course_ids
+                ])
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if is_unique_violation(e):
+                return render_template('error.html', message="Roll number already exists."), 409
+            return render_template('error.html', message="Unknown course."), 400
+        invalidate_count(Student)
         return redirect(url_for('index'))
     else:
-        courses = Course.query.all()
-        return render_template('add_student.html', courses=courses)
+        return render_template('add_student.html', courses=catalog.get())
 
 @app.route('/student/<int:student_id>/update', methods=['GET', 'POST'])
 def update_student(student_id):
@@ -71,20 +187,19 @@ def update_student(student_id):
         student.first_name = request.form['f_name']
         student.last_name = request.form['l_name']
         
-        # Update enrollments
-        Enrollment.query.filter_by(estudent_id=student_id).delete()
-        selected_courses = request.form.getlist('courses')
-        
-        for course_id in selected_courses:
-            enrollment = Enrollment(estudent_id=student.student_id, ecourse_id=int(course_id))
-            db.session.add(enrollment)
-
-        db.session.commit()
+        # A course id that is not an integer, or not in the course table,
+        # fails the whole update
+        try:
+            sync_enrollments(student_id, request.form.getlist('courses'))
+            db.session.commit()
+        except (ValueError, IntegrityError):
+            db.session.rollback()
+            return render_template('error.html', message="Unknown course."), 400
         return redirect(url_for('index'))
     else:
-        courses = Course.query.all()
-        enrolled_courses = [e.ecourse_id for e in Enrollment.query.filter_by(estudent_id=student_id).all()]
-        return render_template('update_student.html', student=student, courses=courses, enrolled_courses=enrolled_courses)
+        # The catalog comes from the cache; only this student's course ids are queried
+        enrolled_courses = {course_id for course_id, in db.session.query(Enrollment.ecourse_id).filter_by(estudent_id=student_id)}
+        return render_template('update_student.html', student=student, courses=catalog.get(), enrolled_courses=enrolled_courses)
 
 @app.route('/student/<int:student_id>/delete')
 def delete_student(student_id):
@@ -92,15 +207,32 @@ def delete_student(student_id):
     Enrollment.query.filter_by(estudent_id=student_id).delete()
     db.session.delete(student)
     db.session.commit()
+    invalidate_count(Student)
     return redirect(url_for('index'))
 
 @app.route('/student/<int:student_id>')
 def student_details(student_id):
-    student = Student.query.get_or_404(student_id)
-    enrollments = Enrollment.query.filter_by(estudent_id=student_id).all()
-    courses = [Course.query.get(e.ecourse_id) for e in enrollments]
+    # Student and enrolled courses in one query. Course objects land in the
+    # session's identity map, which lives for the request, so any later
+    # db.session.get(Course, id) in this request does not hit the database.
+    rows = (
+        db.session.query(Student, Course)
+        .outerjoin(Enrollment, Enrollment.estudent_id == Student.student_id)
+        .outerjoin(Course, Course.course_id == Enrollment.ecourse_id)
+        .filter(Student.student_id == student_id)
+        .order_by(Enrollment.enrollment_id)
+        .all()
+    )
+    if not rows:
+        abort(404)
+    student = rows[0][0]
+    courses = [course for _, course in rows if course is not None]
     return render_template('student_details.html', student=student, courses=courses)
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({'catalog': catalog.stats()})
+
 # Run the application
 if __name__ == '__main__':
     app.run(debug=True)
@@ -13,8 +13,7 @@ def initialize_database():
             Course(course_code="CSE03", course_name="PDSA", course_description="Programming, Data Structures, and Algorithms using Python"),
             Course(course_code="BST13", course_name="BDM", course_description="Business Data Management")
         ]
-        db.session.bulk_save_objects(courses)
-        db.session.commit()
+        db.session.add_all(courses)
 
         # Insert sample students
         students = [
@@ -22,20 +21,11 @@ def initialize_database():
             Student(roll_number="21BCS002", first_name="Bob", last_name="Johnson"),
             Student(roll_number="21BCS003", first_name="Charlie", last_name="Brown")
         ]
-        db.session.bulk_save_objects(students)
-        db.session.commit()  # Commit to assign IDs to students
-
-        # Fetch the course IDs to use in enrollments
-        course1 = Course.query.filter_by(course_code="CSE01").first()
-        course2 = Course.query.filter_by(course_code="CSE02").first()
-        course3 = Course.query.filter_by(course_code="CSE03").first()
-        course4 = Course.query.filter_by(course_code="BST13").first()
-
-        # Fetch the student IDs and create enrollments
-        student1 = Student.query.filter_by(roll_number="21BCS001").first()
-        student2 = Student.query.filter_by(roll_number="21BCS002").first()
-        student3 = Student.query.filter_by(roll_number="21BCS003").first()
+        db.session.add_all(students)
+        db.session.flush()  # Assigns IDs to the objects above, no need to query them back
 
+        student1, student2, student3 = students
+        course1, course2, course3, course4 = courses
         enrollments = [
             Enrollment(estudent_id=student1.student_id, ecourse_id=course1.course_id),
             Enrollment(estudent_id=student1.student_id, ecourse_id=course2.course_id),
@@ -45,7 +35,7 @@ def initialize_database():
             Enrollment(estudent_id=student3.student_id, ecourse_id=course4.course_id)
         ]
 
-        db.session.bulk_save_objects(enrollments)
+        db.session.add_all(enrollments)
         db.session.commit()
 
         print("Database initialized with sample data.")
@@ -0,0 +1,110 @@
+import itertools
+import random
+import sys
+import time
+from sqlalchemy import insert
+from app import app, db, Student, Course, Enrollment
+
+# Synthetic capacity-testing data for the Week-5 schema.
+#
+#   python seed_db.py [students] [courses_per_student] [courses] [seed]
+#
+# Defaults to 10^6 students, 10 courses each (10^7 enrollments) out of 2000
+# courses, with seed 42, so every run produces the same database.  Like
+# init_db.py it drops and recreates all tables first.
+#
+# Rows are generated lazily with sequential explicit ids, so enrollments
+# refer to students and courses without looking anything up, and are
+# inserted CHUNK rows per executemany, one transaction per table.  The
+# enrollment indexes are built after the load, which is much faster than
+# maintaining them row by row.
+
+CHUNK = 20000
+
+FIRST_NAMES = ["Aarav", "Alice", "Bob", "Chen", "Diya", "Elena", "Farah", "Gopal", "Hana", "Ivan",
+               "Jia", "Kabir", "Lena", "Mohan", "Nina", "Omar", "Priya", "Quinn", "Ravi", "Sara",
+               "Tara", "Uma", "Vikram", "Wei", "Yusuf", "Zara"]
+LAST_NAMES = ["Smith", "Johnson", "Brown", "Sharma", "Iyer", "Khan", "Garcia", "Nguyen", "Patel",
+              "Rao", "Singh", "Tanaka", "Wang", "Kumar", "Reddy", "Das", "Menon", "Lopez", None]
+DEPARTMENTS = ["CSE", "BST", "ECE", "MTH", "PHY", "HSS"]
+
+
+def generate_courses(count, rng):
+    for course_id in range(1, count + 1):
+        dept = DEPARTMENTS[course_id % len(DEPARTMENTS)]
+        yield {
+            "course_id": course_id,
+            "course_code": "%s%04d" % (dept, course_id),
+            "course_name": "%s course %d" % (dept, course_id),
+            "course_description": "Level %d %s course" % (rng.randint(1, 4), dept),
+        }
+
+
+def generate_students(count, rng):
+    for student_id in range(1, count + 1):
+        yield {
+            "student_id": student_id,
+            "roll_number": "%02d%s%07d" % (18 + student_id % 6, DEPARTMENTS[student_id % len(DEPARTMENTS)], student_id),
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+        }
+
+
+def generate_enrollments(students, per_student, courses, rng):
+    course_ids = range(1, courses + 1)
+    enrollment_id = itertools.count(1)
+    for student_id in range(1, students + 1):
+        for course_id in sorted(rng.sample(course_ids, per_student)):
+            yield {"enrollment_id": next(enrollment_id), "estudent_id": student_id, "ecourse_id": course_id}
+
+
+def load(conn, table, rows):
+    count = 0
+    statement = insert(table)
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK))
+        if not chunk:
+            return count
+        conn.execute(statement, chunk)
+        count += len(chunk)
+
+
+def seed_database(students=1_000_000, per_student=10, courses=2000, random_seed=42):
+    if per_student > courses:
+        raise ValueError("courses_per_student cannot exceed the number of courses")
+    rng = random.Random(random_seed)
+    enrollment_indexes = list(Enrollment.__table__.indexes)
+    started = time.perf_counter()
+    total = 0
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with db.engine.begin() as conn:
+            for index in enrollment_indexes:
+                index.drop(conn)
+        for table, rows in (
+            (Course.__table__, generate_courses(courses, rng)),
+            (Student.__table__, generate_students(students, rng)),
+            (Enrollment.__table__, generate_enrollments(students, per_student, courses, rng)),
+        ):
+            start = time.perf_counter()
+            with db.engine.begin() as conn:
+                # A seed can simply be rerun, so trade durability for speed
+                conn.exec_driver_sql("PRAGMA synchronous = OFF")
+                count = load(conn, table, rows)
+            elapsed = time.perf_counter() - start
+            total += count
+            print("%-12s %10d rows in %6.1fs  %9.0f rows/s" % (table.name, count, elapsed, count / elapsed))
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            for index in enrollment_indexes:
+                index.create(conn)
+            conn.exec_driver_sql("ANALYZE")
+        print("%-12s %28.1fs" % ("indexes", time.perf_counter() - start))
+    elapsed = time.perf_counter() - started
+    print("%-12s %10d rows in %6.1fs  %9.0f rows/s" % ("total", total, elapsed, total / elapsed))
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:5]]
+    seed_database(*sizes)
@@ -1,7 +1,15 @@
+import json
+import operator
 import os
-from flask import Flask, request
+from flask import Flask, Response, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_restful import Api, Resource
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from catalog_cache import CatalogCache
+from search_index import init_search, match_expression, search_page, search_statement
+from sqlite_tuning import pragma_listener, sqlite_pragmas
 
 app = Flask(__name__)
 
@@ -12,9 +20,27 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///api_database.sqlite3"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# SQLite tuning, applied to every new connection (see sqlite_tuning.py)
+app.config["SQLITE_PRAGMAS"] = sqlite_pragmas()
+
+# Course catalog cache; point CATALOG_CACHE_STAMP at a file shared by all
+# worker processes to keep their caches coherent
+app.config["CATALOG_CACHE_SECONDS"] = 300
+app.config["CATALOG_CACHE_STAMP"] = os.environ.get("CATALOG_CACHE_STAMP")
+# Full-text search page size (see search_index.py)
+app.config["SEARCH_PAGE_SIZE"] = 20
+app.config["MAX_SEARCH_PAGE_SIZE"] = 100
+
 db = SQLAlchemy(app)
 api = Api(app)
 
+apply_sqlite_pragmas = pragma_listener(app)
+
+
+with app.app_context():
+    event.listen(db.engine, "connect", apply_sqlite_pragmas)
+    init_search(db)
+
 
 # Database Models
 class Course(db.Model):
@@ -23,6 +49,9 @@ class Course(db.Model):
     course_name = db.Column(db.String, nullable=False)
     course_code = db.Column(db.String, unique=True, nullable=False)
     course_description = db.Column(db.String)
+    # Bumped by SQLAlchemy on every UPDATE; used as the ETag validator
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Student(db.Model):
@@ -31,6 +60,9 @@ class Student(db.Model):
     roll_number = db.Column(db.String, unique=True, nullable=False)
     first_name = db.Column(db.String, nullable=False)
     last_name = db.Column(db.String)
+    # Bumped by SQLAlchemy on every UPDATE; used as the ETag validator
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
 
 class Enrollment(db.Model):
@@ -40,20 +72,166 @@ class Enrollment(db.Model):
         db.Integer, db.ForeignKey("student.student_id"), nullable=False
     )
     course_id = db.Column(db.Integer, db.ForeignKey("course.course_id"), nullable=False)
+    __table_args__ = (
+        db.Index(
+            "uq_enrollment_student_course", "student_id", "course_id", unique=True
+        ),
+        db.Index("ix_enrollment_course_student", "course_id", "student_id"),
+        # AUTOINCREMENT: ids are never reused, which the enrollment ETag relies on
+        {"sqlite_autoincrement": True},
+    )
+
+
+# Serialization
+#
+# One serializer per model, built once from the table's columns.  It turns an
+# ORM object (serialize) or a plain column row (serialize_row) into a dict.
+# Responses are encoded with orjson when it is installed.
+
+try:
+    import orjson
+
+    def dumps(data):
+        return orjson.dumps(data)
+
+except ImportError:
+
+    def dumps(data):
+        return json.dumps(data, separators=(",", ":")).encode()
+
+
+class Serializer:
+    def __init__(self, model, exclude=("version",)):
+        self.names = tuple(
+            c.key for c in model.__table__.columns if c.key not in exclude
+        )
+        self.columns = tuple(getattr(model, name) for name in self.names)
+        self._get = operator.attrgetter(*self.names)
+
+    def serialize(self, obj):
+        return dict(zip(self.names, self._get(obj)))
+
+    def serialize_row(self, row):
+        return dict(zip(self.names, row))
+
+
+course_serializer = Serializer(Course)
+student_serializer = Serializer(Student)
+enrollment_serializer = Serializer(Enrollment)
+
+
+# Creates are a single INSERT ... RETURNING.  The UNIQUE and FOREIGN KEY
+# constraints do the existence checks, so a conflict or a missing parent row
+# comes back as an IntegrityError instead of needing a SELECT first.
+def is_unique_violation(error):
+    return "UNIQUE constraint failed" in str(error.orig)
+
+
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    response = Response(dumps(data), status=code, mimetype="application/json")
+    response.headers.extend(headers or {})
+    return response
+
+
+STREAM_BATCH = 500
+
+
+# Streams the rows of `statement` as a JSON array, STREAM_BATCH rows per
+# chunk, so the full collection is never built in memory
+def stream_rows(statement, serializer, headers=None):
+    def generate():
+        result = db.session.execute(statement.execution_options(yield_per=STREAM_BATCH))
+        prefix = b"["
+        for rows in result.partitions():
+            yield prefix + b",".join(dumps(serializer.serialize_row(r)) for r in rows)
+            prefix = b","
+        yield b"]" if prefix == b"," else b"[]"
+
+    return Response(
+        stream_with_context(generate()),
+        status=200,
+        mimetype="application/json",
+        headers=headers,
+    )
+
+
+# The full course list as encoded JSON, built once and served from memory
+# until a course is created, changed or deleted.
+def load_catalog():
+    rows = db.session.execute(
+        select(*course_serializer.columns).order_by(Course.course_id)
+    )
+    return dumps([course_serializer.serialize_row(r) for r in rows])
+
+
+catalog = CatalogCache(
+    load_catalog,
+    ttl=app.config["CATALOG_CACHE_SECONDS"],
+    stamp=app.config["CATALOG_CACHE_STAMP"],
+)
+
+
+# Conditional GET
+#
+# Courses and students carry a version column, so their strong ETag is
+# "<kind>-<id>-<version>".  A student's enrollment list is insert/delete only
+# and enrollment ids are never reused, so the row count plus the highest
+# enrollment_id changes whenever the list does and serves as its ETag.  When
+# the client sends If-None-Match, only the validator is read (a single-column
+# query) and a match is answered with 304 without loading the row.
+
+
+def make_etag(*parts):
+    return "-".join(str(p) for p in parts)
+
+
+def etag_headers(etag):
+    return {"ETag": '"%s"' % etag}
+
+
+def not_modified(etag):
+    if request.if_none_match and request.if_none_match.contains(etag):
+        return Response(status=304, headers=etag_headers(etag))
+    return None
+
+
+def row_version(model, key, value):
+    return db.session.query(model.version).filter(key == value).scalar()
+
+
+def enrollments_etag(student_id):
+    count, last_id = (
+        db.session.query(
+            func.count(Enrollment.enrollment_id), func.max(Enrollment.enrollment_id)
+        )
+        .filter(Enrollment.student_id == student_id)
+        .one()
+    )
+    if not count:
+        return None
+    return make_etag("enrollments", student_id, count, last_id)
 
 
 # RESTful Resources
 class CourseAPI(Resource):
-    def get(self, course_id):
+    def get(self, course_id=None):
+        if course_id is None:
+            return Response(catalog.get(), status=200, mimetype="application/json")
         if course_id:
+            if request.if_none_match:
+                version = row_version(Course, Course.course_id, course_id)
+                if version is not None:
+                    response = not_modified(make_etag("course", course_id, version))
+                    if response:
+                        return response
             course = db.session.query(Course).get(course_id)
             if course:
-                return {
-                    "course_id": course.course_id,
-                    "course_name": course.course_name,
-                    "course_code": course.course_code,
-                    "course_description": course.course_description,
-                }, 200
+                return (
+                    course_serializer.serialize(course),
+                    200,
+                    etag_headers(make_etag("course", course.course_id, course.version)),
+                )
             return {"message": "Course not found"}, 404
 
     def post(self):
@@ -68,25 +246,27 @@ class CourseAPI(Resource):
                 "error_code": "COURSE002",
                 "error_message": "Course Code is required",
             }, 400
-        if (
-            db.session.query(Course)
-            .filter(Course.course_code == data["course_code"])
-            .first()
-        ):
+        try:
+            row = db.session.execute(
+                insert(Course)
+                .values(
+                    course_name=data["course_name"],
+                    course_code=data["course_code"],
+                    course_description=data.get("course_description"),
+                )
+                .returning(*course_serializer.columns, Course.version)
+            ).one()
+            db.session.commit()
+        except IntegrityError:
+            # course_code is unique
+            db.session.rollback()
             return {}, 409
-        new_course = Course(
-            course_name=data["course_name"],
-            course_code=data["course_code"],
-            course_description=data.get("course_description"),
+        catalog.invalidate()
+        return (
+            course_serializer.serialize_row(row),
+            201,
+            etag_headers(make_etag("course", row.course_id, row.version)),
         )
-        db.session.add(new_course)
-        db.session.commit()
-        return {
-            "course_id": new_course.course_id,
-            "course_name": new_course.course_name,
-            "course_code": new_course.course_code,
-            "course_description": new_course.course_description,
-        }, 201
 
     def put(self, course_id):
         course = db.session.query(Course).get(course_id)
@@ -98,34 +278,54 @@ class CourseAPI(Resource):
         course.course_description = data.get(
             "course_description", course.course_description
         )
-        db.session.commit()
-        return {
-            "course_id": course.course_id,
-            "course_name": course.course_name,
-            "course_code": course.course_code,
-            "course_description": course.course_description,
-        }, 200
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Changed by a concurrent request since we read it
+            db.session.rollback()
+            return {}, 409
+        catalog.invalidate()
+        return (
+            course_serializer.serialize(course),
+            200,
+            etag_headers(make_etag("course", course.course_id, course.version)),
+        )
 
     def delete(self, course_id):
         course = db.session.query(Course).get(course_id)
         if not course:
             return {"message": "Course not found"}, 404
+        # Foreign keys are enforced, so drop the course's enrollments first
+        db.session.query(Enrollment).filter(Enrollment.course_id == course_id).delete()
         db.session.delete(course)
         db.session.commit()
+        catalog.invalidate()
         return {"message": "Successfully deleted"}, 200
 
 
 class StudentAPI(Resource):
-    def get(self, student_id):
+    def get(self, student_id=None):
+        if student_id is None:
+            return stream_rows(
+                select(*student_serializer.columns).order_by(Student.student_id),
+                student_serializer,
+            )
         if student_id:
+            if request.if_none_match:
+                version = row_version(Student, Student.student_id, student_id)
+                if version is not None:
+                    response = not_modified(make_etag("student", student_id, version))
+                    if response:
+                        return response
             student = db.session.query(Student).get(student_id)
             if student:
-                return {
-                    "student_id": student.student_id,
-                    "first_name": student.first_name,
-                    "last_name": student.last_name,
-                    "roll_number": student.roll_number,
-                }, 200
+                return (
+                    student_serializer.serialize(student),
+                    200,
+                    etag_headers(
+                        make_etag("student", student.student_id, student.version)
+                    ),
+                )
             return {"message": "Student not found"}, 404
 
     def post(self):
@@ -140,25 +340,26 @@ class StudentAPI(Resource):
                 "error_code": "STUDENT002",
                 "error_message": "First Name is required",
             }, 400
-        if (
-            db.session.query(Student)
-            .filter(Student.roll_number == data["roll_number"])
-            .first()
-        ):
+        try:
+            row = db.session.execute(
+                insert(Student)
+                .values(
+                    roll_number=data["roll_number"],
+                    first_name=data["first_name"],
+                    last_name=data.get("last_name"),
+                )
+                .returning(*student_serializer.columns, Student.version)
+            ).one()
+            db.session.commit()
+        except IntegrityError:
+            # roll_number is unique
+            db.session.rollback()
             return {}, 409
-        new_student = Student(
-            roll_number=data["roll_number"],
-            first_name=data["first_name"],
-            last_name=data.get("last_name"),
+        return (
+            student_serializer.serialize_row(row),
+            201,
+            etag_headers(make_etag("student", row.student_id, row.version)),
         )
-        db.session.add(new_student)
-        db.session.commit()
-        return {
-            "student_id": new_student.student_id,
-            "first_name": new_student.first_name,
-            "last_name": new_student.last_name,
-            "roll_number": new_student.roll_number,
-        }, 201
 
     def put(self, student_id):
         student = db.session.query(Student).get(student_id)
@@ -168,18 +369,26 @@ class StudentAPI(Resource):
         student.first_name = data.get("first_name", student.first_name)
         student.last_name = data.get("last_name", student.last_name)
         student.roll_number = data.get("roll_number", student.roll_number)
-        db.session.commit()
-        return {
-            "student_id": student.student_id,
-            "first_name": student.first_name,
-            "last_name": student.last_name,
-            "roll_number": student.roll_number,
-        }, 200
+        try:
+            db.session.commit()
+        except StaleDataError:
+            # Changed by a concurrent request since we read it
+            db.session.rollback()
+            return {}, 409
+        return (
+            student_serializer.serialize(student),
+            200,
+            etag_headers(make_etag("student", student.student_id, student.version)),
+        )
 
     def delete(self, student_id):
         student = db.session.query(Student).get(student_id)
         if not student:
             return {"message": "Student not found"}, 404
+        # Foreign keys are enforced, so drop the student's enrollments first
+        db.session.query(Enrollment).filter(
+            Enrollment.student_id == student_id
+        ).delete()
         db.session.delete(student)
         db.session.commit()
         return {"message": "Successfully deleted"}, 200
@@ -187,48 +396,46 @@ class StudentAPI(Resource):
 
 class EnrollmentAPI(Resource):
     def get(self, student_id):
-        enrollments = (
-            db.session.query(Enrollment)
-            .filter(
-                Enrollment.student_id == student_id,
-            )
-            .all()
+        etag = enrollments_etag(student_id)
+        if etag is None:
+            return {"message": "Enrollment not found"}, 404
+        response = not_modified(etag)
+        if response:
+            return response
+        return stream_rows(
+            select(*enrollment_serializer.columns)
+            .filter(Enrollment.student_id == student_id)
+            .order_by(Enrollment.enrollment_id),
+            enrollment_serializer,
+            etag_headers(etag),
         )
-        if enrollments:
-            return [
-                {
-                    "enrollment_id": enrollment.enrollment_id,
-                    "student_id": enrollment.student_id,
-                    "course_id": enrollment.course_id,
-                }
-                for enrollment in enrollments
-            ], 200
-        return {"message": "Enrollment not found"}, 404
 
     def post(self, student_id):
         data = request.get_json()
-        student = db.session.query(Student).get(student_id)
-        if not student:
-            return {
-                "error_code": "ENROLLMENT002",
-                "error_message": "Student does not exist",
-            }, 404
-        course = db.session.query(Course).get(data["course_id"])
-        if not course:
+        try:
+            row = db.session.execute(
+                insert(Enrollment)
+                .values(student_id=student_id, course_id=data["course_id"])
+                .returning(*enrollment_serializer.columns)
+            ).one()
+            db.session.commit()
+        except IntegrityError as error:
+            db.session.rollback()
+            if is_unique_violation(error):
+                # Already enrolled: (student_id, course_id) is unique
+                return {}, 409
+            # A foreign key failed and SQLite doesn't say which, so only on
+            # this path look up the student to pick the error code
+            if db.session.get(Student, student_id) is None:
+                return {
+                    "error_code": "ENROLLMENT002",
+                    "error_message": "Student does not exist",
+                }, 404
             return {
                 "error_code": "ENROLLMENT001",
                 "error_message": "Course does not exist",
             }, 404
-        new_enrollment = Enrollment(student_id=student_id, course_id=data["course_id"])
-        db.session.add(new_enrollment)
-        db.session.commit()
-        return [
-            {
-                "enrollment_id": new_enrollment.enrollment_id,
-                "student_id": new_enrollment.student_id,
-                "course_id": new_enrollment.course_id,
-            }
-        ], 201
+        return [enrollment_serializer.serialize_row(row)], 201
 
     def delete(self, student_id, course_id):
         enrollment = (
@@ -245,9 +452,381 @@ class EnrollmentAPI(Resource):
         return {"message": "Successfully deleted"}, 200
 
 
+# Bulk creation
+#
+# Each bulk endpoint takes a JSON array, or NDJSON (Content-Type
+# application/x-ndjson, one object per line).  Items are validated in one
+# pass, conflicts with existing rows are found with set-based IN queries, and
+# every valid item is inserted with one executemany-style INSERT ... RETURNING
+# in a single transaction.  The response lists
+# one result per item, in input order, using the same status codes and
+# error codes as the single-item endpoints.
+
+BULK_CHUNK = 500  # stays under SQLite's bound-parameter limit
+
+
+def chunked(values, size=BULK_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def bulk_items():
+    if request.mimetype == "application/x-ndjson":
+        text = request.get_data(as_text=True)
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array")
+    return items
+
+
+def bulk_error(message):
+    return {"error_code": "BULK001", "error_message": message}, 400
+
+
+# The item result for the first of `fields` that is present but not a
+# string, or None
+def bulk_type_error(data, fields):
+    for field in fields:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            return {
+                "status": 400,
+                "error_code": "BULK002",
+                "error_message": "%s must be a string" % field,
+            }
+    return None
+
+
+def existing_keys(column, values):
+    found = set()
+    for chunk in chunked(values):
+        found.update(v for (v,) in db.session.query(column).filter(column.in_(chunk)))
+    return found
+
+
+# Inserts rows whose unique `key` was free at the duplicate check and returns
+# ({key: id} of the inserted rows, keys taken meanwhile).  A concurrent
+# request can insert one of the keys before this runs, which fails the whole
+# statement; the rows whose keys are now taken are set aside and the rest
+# inserted again.
+def insert_unique(model, key, id_column, rows):
+    taken = set()
+    while rows:
+        try:
+            ids = dict(
+                db.session.execute(insert(model).returning(key, id_column), rows).all()
+            )
+            db.session.commit()
+            return ids, taken
+        except IntegrityError:
+            db.session.rollback()
+            now_taken = existing_keys(key, [row[key.key] for row in rows])
+            if not now_taken:
+                raise
+            taken |= now_taken
+            rows = [row for row in rows if row[key.key] not in now_taken]
+    return {}, taken
+
+
+def bulk_response(results):
+    status = 201 if all(r["status"] == 201 for r in results) else 207
+    return {"results": results}, status
+
+
+class StudentBulkAPI(Resource):
+    def post(self):
+        try:
+            items = bulk_items()
+        except ValueError as e:
+            return bulk_error(str(e))
+        results = [None] * len(items)
+        pending = {}
+        for i, data in enumerate(items):
+            type_error = isinstance(data, dict) and bulk_type_error(
+                data, ("roll_number", "first_name", "last_name")
+            )
+            if not isinstance(data, dict) or not data.get("roll_number"):
+                results[i] = {
+                    "status": 400,
+                    "error_code": "STUDENT001",
+                    "error_message": "Roll Number required",
+                }
+            elif not data.get("first_name"):
+                results[i] = {
+                    "status": 400,
+                    "error_code": "STUDENT002",
+                    "error_message": "First Name is required",
+                }
+            elif type_error:
+                results[i] = type_error
+            elif data["roll_number"] in pending:
+                results[i] = {"status": 409}
+            else:
+                pending[data["roll_number"]] = i
+
+        existing = existing_keys(Student.roll_number, pending)
+        rows = []
+        for roll_number, i in pending.items():
+            if roll_number in existing:
+                results[i] = {"status": 409}
+                continue
+            rows.append(
+                {
+                    "roll_number": roll_number,
+                    "first_name": items[i]["first_name"],
+                    "last_name": items[i].get("last_name"),
+                }
+            )
+        if rows:
+            ids, taken = insert_unique(
+                Student, Student.roll_number, Student.student_id, rows
+            )
+            for roll_number in taken:
+                results[pending[roll_number]] = {"status": 409}
+            for row in rows:
+                if row["roll_number"] in taken:
+                    continue
+                row["student_id"] = ids[row["roll_number"]]
+                results[pending[row["roll_number"]]] = {
+                    "status": 201,
+                    **student_serializer.serialize_row(
+                        row[name] for name in student_serializer.names
+                    ),
+                }
+        return bulk_response(results)
+
+
+class CourseBulkAPI(Resource):
+    def post(self):
+        try:
+            items = bulk_items()
+        except ValueError as e:
+            return bulk_error(str(e))
+        results = [None] * len(items)
+        pending = {}
+        for i, data in enumerate(items):
+            type_error = isinstance(data, dict) and bulk_type_error(
+                data, ("course_name", "course_code", "course_description")
+            )
+            if not isinstance(data, dict) or not data.get("course_name"):
+                results[i] = {
+                    "status": 400,
+                    "error_code": "COURSE001",
+                    "error_message": "Course Name is required",
+                }
+            elif not data.get("course_code"):
+                results[i] = {
+                    "status": 400,
+                    "error_code": "COURSE002",
+                    "error_message": "Course Code is required",
+                }
+            elif type_error:
+                results[i] = type_error
+            elif data["course_code"] in pending:
+                results[i] = {"status": 409}
+            else:
+                pending[data["course_code"]] = i
+
+        existing = existing_keys(Course.course_code, pending)
+        rows = []
+        for course_code, i in pending.items():
+            if course_code in existing:
+                results[i] = {"status": 409}
+                continue
+            rows.append(
+                {
+                    "course_name": items[i]["course_name"],
+                    "course_code": course_code,
+                    "course_description": items[i].get("course_description"),
+                }
+            )
+        if rows:
+            ids, taken = insert_unique(
+                Course, Course.course_code, Course.course_id, rows
+            )
+            if ids:
+                catalog.invalidate()
+            for course_code in taken:
+                results[pending[course_code]] = {"status": 409}
+            for row in rows:
+                if row["course_code"] in taken:
+                    continue
+                row["course_id"] = ids[row["course_code"]]
+                results[pending[row["course_code"]]] = {
+                    "status": 201,
+                    **course_serializer.serialize_row(
+                        row[name] for name in course_serializer.names
+                    ),
+                }
+        return bulk_response(results)
+
+
+# {(student_id, course_id): item result} for the pairs that cannot be
+# enrolled now: a missing student or course, or an existing enrollment
+def enrollment_failures(pairs):
+    pairs = set(pairs)
+    student_ids = {s for s, _ in pairs}
+    course_ids = {c for _, c in pairs}
+    students, courses, enrolled = set(), set(), set()
+    for chunk in chunked(student_ids):
+        students.update(
+            s
+            for (s,) in db.session.query(Student.student_id).filter(
+                Student.student_id.in_(chunk)
+            )
+        )
+        enrolled.update(
+            db.session.query(Enrollment.student_id, Enrollment.course_id).filter(
+                Enrollment.student_id.in_(chunk)
+            )
+        )
+    for chunk in chunked(course_ids):
+        courses.update(
+            c
+            for (c,) in db.session.query(Course.course_id).filter(
+                Course.course_id.in_(chunk)
+            )
+        )
+
+    failed = {}
+    for student_id, course_id in pairs:
+        if student_id not in students:
+            failed[(student_id, course_id)] = {
+                "status": 404,
+                "error_code": "ENROLLMENT002",
+                "error_message": "Student does not exist",
+            }
+        elif course_id not in courses:
+            failed[(student_id, course_id)] = {
+                "status": 404,
+                "error_code": "ENROLLMENT001",
+                "error_message": "Course does not exist",
+            }
+        elif (student_id, course_id) in enrolled:
+            failed[(student_id, course_id)] = {"status": 409}
+    return failed
+
+
+class EnrollmentBulkAPI(Resource):
+    def post(self):
+        try:
+            items = bulk_items()
+        except ValueError as e:
+            return bulk_error(str(e))
+        results = [None] * len(items)
+        pending = {}
+        for i, data in enumerate(items):
+            try:
+                pair = (int(data["student_id"]), int(data["course_id"]))
+            except (TypeError, KeyError, ValueError):
+                results[i] = {
+                    "status": 400,
+                    "error_code": "BULK002",
+                    "error_message": "student_id and course_id are required",
+                }
+                continue
+            if pair in pending:
+                results[i] = {"status": 409}
+            else:
+                pending[pair] = i
+
+        failed = enrollment_failures(pending)
+        rows = [
+            {"student_id": student_id, "course_id": course_id}
+            for (student_id, course_id) in pending
+            if (student_id, course_id) not in failed
+        ]
+        # A concurrent request can enroll one of the pairs, or delete a
+        # student or course, after the check above, which fails the whole
+        # statement; check the rows again and insert the ones still valid
+        returned = []
+        while rows:
+            try:
+                returned = db.session.execute(
+                    insert(Enrollment).returning(*enrollment_serializer.columns),
+                    rows,
+                ).all()
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                now_failed = enrollment_failures(
+                    (row["student_id"], row["course_id"]) for row in rows
+                )
+                if not now_failed:
+                    raise
+                failed.update(now_failed)
+                rows = [
+                    row
+                    for row in rows
+                    if (row["student_id"], row["course_id"]) not in now_failed
+                ]
+        for pair, result in failed.items():
+            results[pending[pair]] = result
+        for row in returned:
+            item = enrollment_serializer.serialize_row(row)
+            results[pending[(item["student_id"], item["course_id"])]] = {
+                "status": 201,
+                **item,
+            }
+        return bulk_response(results)
+
+
+# Full-text search, ranked best match first:
+# GET /api/student/search?q=jo+sm&size=20&offset=0 (or /api/course/search)
+#
+# The response has the page of results and the offset of the next page, or
+# null on the last one.  Shared with asgi.py, which passes its query string
+# as a werkzeug MultiDict.
+search_serializers = {"student": student_serializer, "course": course_serializer}
+
+
+def search_args(args):
+    size = args.get("size", app.config["SEARCH_PAGE_SIZE"], type=int)
+    size = max(1, min(size, app.config["MAX_SEARCH_PAGE_SIZE"]))
+    offset = max(0, args.get("offset", 0, type=int))
+    return match_expression(args.get("q")), size, offset
+
+
+def search_results(kind, rows, size, offset):
+    serializer = search_serializers[kind]
+    rows, next_offset = search_page(rows, size, offset)
+    return {
+        "results": [
+            serializer.serialize_row(row[name] for name in serializer.names)
+            for row in rows
+        ],
+        "next_offset": next_offset,
+    }
+
+
+class SearchAPI(Resource):
+    def get(self, kind):
+        match, size, offset = search_args(request.args)
+        rows = []
+        if match:
+            rows = (
+                db.session.execute(search_statement(kind, match, size, offset))
+                .mappings()
+                .all()
+            )
+        return search_results(kind, rows, size, offset), 200
+
+
+class CacheStatsAPI(Resource):
+    def get(self):
+        return {"catalog": catalog.stats()}, 200
+
+
 # Add Resources to API
 api.add_resource(CourseAPI, "/api/course", "/api/course/<int:course_id>")
 api.add_resource(StudentAPI, "/api/student", "/api/student/<int:student_id>")
+api.add_resource(StudentBulkAPI, "/api/student/bulk")
+api.add_resource(CourseBulkAPI, "/api/course/bulk")
+api.add_resource(EnrollmentBulkAPI, "/api/enrollment/bulk")
+api.add_resource(CacheStatsAPI, "/api/cache/stats")
+api.add_resource(SearchAPI, "/api/<any(student, course):kind>/search")
 api.add_resource(
     EnrollmentAPI,
     "/api/student/<int:student_id>/course",
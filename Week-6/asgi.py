@@ -0,0 +1,515 @@
+import asyncio
+import http
+import json
+import time
+import uvicorn
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.endpoints import HTTPEndpoint
+from starlette.exceptions import HTTPException
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import default_exceptions
+from werkzeug.http import parse_etags
+from catalog_cache import CatalogCache
+from search_index import search_statement
+from app import app as flask_app
+from app import (
+    STREAM_BATCH,
+    Course,
+    Enrollment,
+    Student,
+    apply_sqlite_pragmas,
+    course_serializer,
+    db,
+    dumps,
+    enrollment_serializer,
+    etag_headers,
+    is_unique_violation,
+    make_etag,
+    search_args,
+    search_results,
+    search_serializers,
+    student_serializer,
+)
+
+# Async deployment of the Week-6 REST API
+#
+# Serves the /api/course, /api/student, /api/student/<id>/course and
+# /api/<student|course>/search contract of app.py on asyncio: Starlette
+# behind uvicorn, with SQLAlchemy's asyncio extension over the aiosqlite
+# driver.  Models, serializers, ETags, SQLite pragmas, config, search and the
+# course catalog cache all come from app.py, so both deployments return the
+# same bodies, status codes, error codes and ETags for the same database,
+# including werkzeug's HTML page for a URL no route matches.  A 405's Allow
+# header lists only the handled methods, where Flask adds HEAD and OPTIONS.
+# The bulk endpoints are only served by app.py.
+#
+#   uvicorn asgi:app --host 127.0.0.1 --port 5000
+#   python asgi.py
+
+with flask_app.app_context():
+    url = db.engine.url.set(drivername="sqlite+aiosqlite")
+engine = create_async_engine(url)
+event.listen(engine.sync_engine, "connect", apply_sqlite_pragmas)
+# Objects stay readable after commit without another round trip
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+def json_response(data, status=200, headers=None):
+    return Response(
+        dumps(data), status_code=status, headers=headers, media_type="application/json"
+    )
+
+
+# Errors get Flask-RESTful's {"message": ...} bodies: an explicit detail, or
+# werkzeug's description of the status code
+def error_message(status, detail=None):
+    if detail is None or detail == http.HTTPStatus(status).phrase:
+        detail = default_exceptions[status].description
+    return {"message": detail}
+
+
+async def get_json(request):
+    # Same checks and errors as Flask's request.get_json()
+    mimetype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if not (
+        mimetype == "application/json"
+        or (mimetype.startswith("application/") and mimetype.endswith("+json"))
+    ):
+        raise HTTPException(
+            415,
+            "Did not attempt to load JSON data because the request"
+            " Content-Type was not 'application/json'.",
+        )
+    try:
+        return json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(400)
+
+
+def not_modified(request, etag):
+    if parse_etags(request.headers.get("if-none-match")).contains(etag):
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+
+async def row_version(session, model, key, value):
+    return await session.scalar(select(model.version).where(key == value))
+
+
+async def enrollments_etag(session, student_id):
+    count, last_id = (
+        await session.execute(
+            select(
+                func.count(Enrollment.enrollment_id), func.max(Enrollment.enrollment_id)
+            ).where(Enrollment.student_id == student_id)
+        )
+    ).one()
+    if not count:
+        return None
+    return make_etag("enrollments", student_id, count, last_id)
+
+
+def stream_rows(statement, serializer, headers=None):
+    async def generate():
+        async with Session() as session:
+            result = await session.stream(
+                statement.execution_options(yield_per=STREAM_BATCH)
+            )
+            prefix = b"["
+            async for rows in result.partitions():
+                yield prefix + b",".join(
+                    dumps(serializer.serialize_row(r)) for r in rows
+                )
+                prefix = b","
+            yield b"]" if prefix == b"," else b"[]"
+
+    return StreamingResponse(generate(), headers=headers, media_type="application/json")
+
+
+# CatalogCache (same TTL, stamp file and stats) with a loader that is awaited
+# under an asyncio lock instead of called under a thread lock.  aget() is the
+# coroutine counterpart of get(), which keeps its synchronous meaning.
+class AsyncCatalogCache(CatalogCache):
+    def __init__(self, loader, ttl=300, stamp=None):
+        super().__init__(loader, ttl, stamp)
+        self._async_lock = asyncio.Lock()
+
+    async def aget(self, session):
+        version = (self._generation, self._stamp_mtime())
+        async with self._async_lock:
+            if (
+                self._version == version
+                and time.monotonic() - self._loaded_at < self.ttl
+            ):
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            self._value = await self.loader(session)
+            self._version = version
+            self._loaded_at = time.monotonic()
+            return self._value
+
+
+async def load_catalog(session):
+    rows = await session.execute(
+        select(*course_serializer.columns).order_by(Course.course_id)
+    )
+    return dumps([course_serializer.serialize_row(r) for r in rows])
+
+
+catalog = AsyncCatalogCache(
+    load_catalog,
+    ttl=flask_app.config["CATALOG_CACHE_SECONDS"],
+    stamp=flask_app.config["CATALOG_CACHE_STAMP"],
+)
+
+
+class CourseAPI(HTTPEndpoint):
+    async def get(self, request):
+        course_id = request.path_params.get("course_id")
+        async with Session() as session:
+            if course_id is None:
+                return Response(
+                    await catalog.aget(session), media_type="application/json"
+                )
+            if not course_id:
+                return json_response(None)
+            if request.headers.get("if-none-match"):
+                version = await row_version(
+                    session, Course, Course.course_id, course_id
+                )
+                if version is not None:
+                    response = not_modified(
+                        request, make_etag("course", course_id, version)
+                    )
+                    if response:
+                        return response
+            course = await session.get(Course, course_id)
+            if course:
+                return json_response(
+                    course_serializer.serialize(course),
+                    200,
+                    etag_headers(make_etag("course", course.course_id, course.version)),
+                )
+            return json_response({"message": "Course not found"}, 404)
+
+    async def post(self, request):
+        data = await get_json(request)
+        if not data.get("course_name"):
+            return json_response(
+                {"error_code": "COURSE001", "error_message": "Course Name is required"},
+                400,
+            )
+        if not data.get("course_code"):
+            return json_response(
+                {"error_code": "COURSE002", "error_message": "Course Code is required"},
+                400,
+            )
+        async with Session() as session:
+            try:
+                result = await session.execute(
+                    insert(Course)
+                    .values(
+                        course_name=data["course_name"],
+                        course_code=data["course_code"],
+                        course_description=data.get("course_description"),
+                    )
+                    .returning(*course_serializer.columns, Course.version)
+                )
+                row = result.one()
+                await session.commit()
+            except IntegrityError:
+                # course_code is unique
+                await session.rollback()
+                return json_response({}, 409)
+        catalog.invalidate()
+        return json_response(
+            course_serializer.serialize_row(row),
+            201,
+            etag_headers(make_etag("course", row.course_id, row.version)),
+        )
+
+    async def put(self, request):
+        course_id = request.path_params["course_id"]
+        async with Session() as session:
+            course = await session.get(Course, course_id)
+            if not course:
+                return json_response({"message": "Course not found"}, 404)
+            data = await get_json(request)
+            course.course_name = data.get("course_name", course.course_name)
+            course.course_code = data.get("course_code", course.course_code)
+            course.course_description = data.get(
+                "course_description", course.course_description
+            )
+            try:
+                await session.commit()
+            except StaleDataError:
+                # Changed by a concurrent request since we read it
+                await session.rollback()
+                return json_response({}, 409)
+        catalog.invalidate()
+        return json_response(
+            course_serializer.serialize(course),
+            200,
+            etag_headers(make_etag("course", course.course_id, course.version)),
+        )
+
+    async def delete(self, request):
+        course_id = request.path_params["course_id"]
+        async with Session() as session:
+            course = await session.get(Course, course_id)
+            if not course:
+                return json_response({"message": "Course not found"}, 404)
+            # Foreign keys are enforced, so drop the course's enrollments first
+            await session.execute(
+                delete(Enrollment).where(Enrollment.course_id == course_id)
+            )
+            await session.delete(course)
+            await session.commit()
+        catalog.invalidate()
+        return json_response({"message": "Successfully deleted"}, 200)
+
+
+class StudentAPI(HTTPEndpoint):
+    async def get(self, request):
+        student_id = request.path_params.get("student_id")
+        if student_id is None:
+            return stream_rows(
+                select(*student_serializer.columns).order_by(Student.student_id),
+                student_serializer,
+            )
+        if not student_id:
+            return json_response(None)
+        async with Session() as session:
+            if request.headers.get("if-none-match"):
+                version = await row_version(
+                    session, Student, Student.student_id, student_id
+                )
+                if version is not None:
+                    response = not_modified(
+                        request, make_etag("student", student_id, version)
+                    )
+                    if response:
+                        return response
+            student = await session.get(Student, student_id)
+            if student:
+                return json_response(
+                    student_serializer.serialize(student),
+                    200,
+                    etag_headers(
+                        make_etag("student", student.student_id, student.version)
+                    ),
+                )
+            return json_response({"message": "Student not found"}, 404)
+
+    async def post(self, request):
+        data = await get_json(request)
+        if not data.get("roll_number"):
+            return json_response(
+                {"error_code": "STUDENT001", "error_message": "Roll Number required"},
+                400,
+            )
+        if not data.get("first_name"):
+            return json_response(
+                {"error_code": "STUDENT002", "error_message": "First Name is required"},
+                400,
+            )
+        async with Session() as session:
+            try:
+                result = await session.execute(
+                    insert(Student)
+                    .values(
+                        roll_number=data["roll_number"],
+                        first_name=data["first_name"],
+                        last_name=data.get("last_name"),
+                    )
+                    .returning(*student_serializer.columns, Student.version)
+                )
+                row = result.one()
+                await session.commit()
+            except IntegrityError:
+                # roll_number is unique
+                await session.rollback()
+                return json_response({}, 409)
+        return json_response(
+            student_serializer.serialize_row(row),
+            201,
+            etag_headers(make_etag("student", row.student_id, row.version)),
+        )
+
+    async def put(self, request):
+        student_id = request.path_params["student_id"]
+        async with Session() as session:
+            student = await session.get(Student, student_id)
+            if not student:
+                return json_response({"message": "Student not found"}, 404)
+            data = await get_json(request)
+            student.first_name = data.get("first_name", student.first_name)
+            student.last_name = data.get("last_name", student.last_name)
+            student.roll_number = data.get("roll_number", student.roll_number)
+            try:
+                await session.commit()
+            except StaleDataError:
+                # Changed by a concurrent request since we read it
+                await session.rollback()
+                return json_response({}, 409)
+        return json_response(
+            student_serializer.serialize(student),
+            200,
+            etag_headers(make_etag("student", student.student_id, student.version)),
+        )
+
+    async def delete(self, request):
+        student_id = request.path_params["student_id"]
+        async with Session() as session:
+            student = await session.get(Student, student_id)
+            if not student:
+                return json_response({"message": "Student not found"}, 404)
+            # Foreign keys are enforced, so drop the student's enrollments first
+            await session.execute(
+                delete(Enrollment).where(Enrollment.student_id == student_id)
+            )
+            await session.delete(student)
+            await session.commit()
+        return json_response({"message": "Successfully deleted"}, 200)
+
+
+class EnrollmentAPI(HTTPEndpoint):
+    async def get(self, request):
+        student_id = request.path_params["student_id"]
+        async with Session() as session:
+            etag = await enrollments_etag(session, student_id)
+        if etag is None:
+            return json_response({"message": "Enrollment not found"}, 404)
+        response = not_modified(request, etag)
+        if response:
+            return response
+        return stream_rows(
+            select(*enrollment_serializer.columns)
+            .where(Enrollment.student_id == student_id)
+            .order_by(Enrollment.enrollment_id),
+            enrollment_serializer,
+            etag_headers(etag),
+        )
+
+    async def post(self, request):
+        student_id = request.path_params["student_id"]
+        data = await get_json(request)
+        async with Session() as session:
+            try:
+                result = await session.execute(
+                    insert(Enrollment)
+                    .values(student_id=student_id, course_id=data["course_id"])
+                    .returning(*enrollment_serializer.columns)
+                )
+                row = result.one()
+                await session.commit()
+            except IntegrityError as error:
+                await session.rollback()
+                if is_unique_violation(error):
+                    # Already enrolled: (student_id, course_id) is unique
+                    return json_response({}, 409)
+                # A foreign key failed; look up the student to pick the code
+                if await session.get(Student, student_id) is None:
+                    return json_response(
+                        {
+                            "error_code": "ENROLLMENT002",
+                            "error_message": "Student does not exist",
+                        },
+                        404,
+                    )
+                return json_response(
+                    {
+                        "error_code": "ENROLLMENT001",
+                        "error_message": "Course does not exist",
+                    },
+                    404,
+                )
+        return json_response([enrollment_serializer.serialize_row(row)], 201)
+
+    async def delete(self, request):
+        student_id = request.path_params["student_id"]
+        course_id = request.path_params["course_id"]
+        async with Session() as session:
+            enrollment = await session.scalar(
+                select(Enrollment)
+                .where(
+                    Enrollment.student_id == student_id,
+                    Enrollment.course_id == course_id,
+                )
+                .limit(1)
+            )
+            if not enrollment:
+                return json_response({"message": "Enrollment not found"}, 404)
+            await session.delete(enrollment)
+            await session.commit()
+        return json_response({"message": "Successfully deleted"}, 200)
+
+
+# One route per kind, as Flask's <any(student, course):kind> converter
+# matches only those, so any other kind is a router 404
+def search_endpoint(kind):
+    async def search(request):
+        return await search_kind(request, kind)
+
+    return search
+
+
+async def search_kind(request, kind):
+    match, size, offset = search_args(MultiDict(request.query_params.multi_items()))
+    rows = []
+    if match:
+        async with Session() as session:
+            result = await session.execute(search_statement(kind, match, size, offset))
+            rows = result.mappings().all()
+    return json_response(search_results(kind, rows, size, offset), 200)
+
+
+async def cache_stats(request):
+    return json_response({"catalog": catalog.stats()}, 200)
+
+
+async def http_error(request, exc):
+    if exc.status_code == 404 and "endpoint" not in request.scope:
+        # No route matched: Flask answers these itself, with werkzeug's HTML
+        # page, before Flask-RESTful's JSON errors apply
+        return Response(
+            default_exceptions[404]().get_body(),
+            status_code=404,
+            media_type="text/html",
+        )
+    return json_response(
+        error_message(exc.status_code, exc.detail), exc.status_code, exc.headers
+    )
+
+
+async def server_error(request, exc):
+    # Flask-RESTful's body for unhandled exceptions
+    return json_response({"message": "Internal Server Error"}, 500)
+
+
+app = Starlette(
+    routes=[
+        Route("/api/course", CourseAPI),
+        Route("/api/course/{course_id:int}", CourseAPI),
+        Route("/api/student", StudentAPI),
+        Route("/api/student/{student_id:int}", StudentAPI),
+        Route("/api/student/{student_id:int}/course", EnrollmentAPI),
+        Route("/api/student/{student_id:int}/course/{course_id:int}", EnrollmentAPI),
+        Route("/api/cache/stats", cache_stats),
+        *(
+            Route("/api/%s/search" % kind, search_endpoint(kind))
+            for kind in search_serializers
+        ),
+    ],
+    exception_handlers={HTTPException: http_error, Exception: server_error},
+)
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=5000)
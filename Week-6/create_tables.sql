@@ -3,7 +3,8 @@ CREATE TABLE course (
     course_id INTEGER PRIMARY KEY AUTOINCREMENT,
     course_name TEXT NOT NULL,
     course_code TEXT UNIQUE NOT NULL,
-    course_description TEXT
+    course_description TEXT,
+    version INTEGER NOT NULL DEFAULT 1
 );
 
 -- Create the Student table
@@ -11,7 +12,8 @@ CREATE TABLE student (
     student_id INTEGER PRIMARY KEY AUTOINCREMENT,
     roll_number TEXT UNIQUE NOT NULL,
     first_name TEXT NOT NULL,
-    last_name TEXT
+    last_name TEXT,
+    version INTEGER NOT NULL DEFAULT 1
 );
 
 -- Create the Enrollment table
@@ -23,6 +25,10 @@ CREATE TABLE enrollments (
     FOREIGN KEY (course_id) REFERENCES course(course_id)
 );
 
+-- Lookups by student, by course and by (student, course)
+CREATE UNIQUE INDEX uq_enrollments_student_course ON enrollments (student_id, course_id);
+CREATE INDEX ix_enrollments_course_student ON enrollments (course_id, student_id);
+
 -- Insert sample data into the Course table
 INSERT INTO course (course_name, course_code, course_description) VALUES
 ('Mathematics', 'MATH101', 'Basic Mathematics course'),
@@ -0,0 +1,145 @@
+import re
+from sqlalchemy import event, text
+
+# Full-text search over students and courses with SQLite FTS5.
+#
+# Each searchable table gets an external-content FTS5 index, <table>_fts,
+# which holds only the index and reads column values back from the table.
+# Triggers keep it in step with every INSERT, DELETE and UPDATE of an indexed
+# column, whatever issues them (ORM, bulk executemany, plain SQL), so no
+# application code has to remember to reindex.
+#
+# A search matches rows containing every word of the search text as a prefix
+# ("jo sm" finds John Smith).  Results are ranked with bm25, weighting the
+# identifying column (roll number, course code) above names and names above
+# descriptions, and paged with LIMIT/OFFSET over that ranking.
+#
+# Every match is scored, so the ranking and the pages cover all of them.
+# The cost grows with the number of matches: a short prefix like "sm" over
+# 10^6 students matches tens of thousands of rows and takes over 100 ms,
+# while each further word narrows the matches and the time with them.
+
+SEARCH_INDEXES = {
+    # name: (table, key column, {indexed column: bm25 weight})
+    "student": (
+        "student",
+        "student_id",
+        {"roll_number": 10.0, "first_name": 5.0, "last_name": 5.0},
+    ),
+    "course": (
+        "course",
+        "course_id",
+        {"course_code": 10.0, "course_name": 5.0, "course_description": 1.0},
+    ),
+}
+
+# Words of the search text beyond this are ignored
+MAX_TERMS = 8
+
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+    "content='{table}', content_rowid='{key}', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.{key}, {new}); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.{key}, {old}); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.{key}, {old}); "
+    "INSERT INTO {fts}(rowid, {columns}) VALUES (new.{key}, {new}); END",
+    # Index the rows that are already in the table
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+)
+
+
+def _tables(conn):
+    return {
+        name
+        for (name,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+
+
+# Creates the index and triggers for every searchable table that exists and
+# is not indexed yet; safe to run on every start
+def create_search_indexes(conn):
+    existing = _tables(conn)
+    for table, key, weights in SEARCH_INDEXES.values():
+        fts = table + "_fts"
+        if table not in existing or fts in existing:
+            continue
+        names = {
+            "fts": fts,
+            "table": table,
+            "key": key,
+            "columns": ", ".join(weights),
+            "new": ", ".join("new." + column for column in weights),
+            "old": ", ".join("old." + column for column in weights),
+        }
+        for statement in CREATE_INDEX:
+            conn.exec_driver_sql(statement.format(**names))
+
+
+def drop_search_indexes(conn):
+    existing = _tables(conn)
+    for table, _, _ in SEARCH_INDEXES.values():
+        if table + "_fts" in existing:
+            # The triggers belong to the content table, not the index
+            for trigger in ("insert", "delete", "update"):
+                conn.exec_driver_sql(
+                    "DROP TRIGGER IF EXISTS %s_fts_%s" % (table, trigger)
+                )
+            conn.exec_driver_sql("DROP TABLE %s_fts" % table)
+
+
+# Sets up the indexes on `db`'s database now, and again whenever
+# db.create_all() creates the tables (db.drop_all() drops them)
+def init_search(db):
+    event.listen(
+        db.metadata,
+        "after_create",
+        lambda target, conn, **kw: create_search_indexes(conn),
+    )
+    event.listen(
+        db.metadata, "before_drop", lambda target, conn, **kw: drop_search_indexes(conn)
+    )
+    with db.engine.begin() as conn:
+        create_search_indexes(conn)
+
+
+# The FTS5 query for free text: each word quoted, so query syntax in user
+# input (AND, NEAR, column filters, quotes) is taken literally, and marked as
+# a prefix.  Empty when the text has no words.
+def match_expression(query):
+    words = re.findall(r"\w+", query or "")[:MAX_TERMS]
+    return " ".join('"%s"*' % word for word in words)
+
+
+# One page of ranked matches for a non-empty match_expression(), with the
+# key and indexed columns of the table.  Fetches size + 1 rows; pass them to
+# search_page().
+def search_statement(name, match, size, offset=0):
+    table, key, weights = SEARCH_INDEXES[name]
+    return text(
+        # Ranked within the index; only the page itself is joined back to
+        # the table
+        "SELECT {columns} FROM ("
+        " SELECT rowid, bm25({fts}, {weights}) AS score FROM {fts}"
+        " WHERE {fts} MATCH :match"
+        " ORDER BY score LIMIT :limit OFFSET :offset"
+        ") AS hits JOIN {table} ON {table}.{key} = hits.rowid "
+        "ORDER BY hits.score".format(
+            fts=table + "_fts",
+            table=table,
+            key=key,
+            columns=", ".join(table + "." + column for column in (key, *weights)),
+            weights=", ".join(str(weight) for weight in weights.values()),
+        )
+    ).bindparams(match=match, limit=size + 1, offset=offset)
+
+
+# (rows of this page, offset of the next page or None)
+def search_page(rows, size, offset=0):
+    next_offset = offset + size if len(rows) > size else None
+    return rows[:size], next_offset
@@ -0,0 +1,35 @@
+import json
+import os
+
+# SQLite tuning profile of the Week-5, Week-6 and Week-7 apps, applied to
+# every new connection.  This file is the same in each of them, and
+# tools/bench_sqlite_tuning.py measures this profile, so change it here and
+# copy it to the other weeks.
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",  # readers are not blocked by a writer
+    "synchronous": "NORMAL",  # durable in WAL mode without an fsync per commit
+    "cache_size": -65536,  # 64 MiB page cache
+    "mmap_size": 268435456,  # 256 MiB of memory-mapped reads
+    "busy_timeout": 5000,  # wait up to 5 s for a lock instead of failing
+    "foreign_keys": "ON",
+}
+
+
+# The profile with per-deployment overrides from a JSON object in the
+# SQLITE_PRAGMAS environment variable, e.g. SQLITE_PRAGMAS='{"synchronous": "FULL"}'
+def sqlite_pragmas():
+    pragmas = dict(SQLITE_PRAGMAS)
+    pragmas.update(json.loads(os.environ.get("SQLITE_PRAGMAS", "{}")))
+    return pragmas
+
+
+# A "connect" event listener that applies app.config["SQLITE_PRAGMAS"]
+def pragma_listener(app):
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in app.config["SQLITE_PRAGMAS"].items():
+            cursor.execute("PRAGMA %s = %s" % (name, value))
+        cursor.close()
+
+    return apply_sqlite_pragmas
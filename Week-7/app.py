@@ -1,14 +1,52 @@
 from flask import Flask, request, jsonify, render_template, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_restful import Api, Resource
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from query_counter import init_query_counter
+from profiling import init_profiling
+from catalog_cache import CatalogCache
+from search_index import init_search, match_expression, search_page, search_statement
+from course_stats import enrollment_counts, init_course_stats
+from page_cache import PageCache
+from sqlite_tuning import pragma_listener, sqlite_pragmas
+import bisect
 import os
+import time
 
 app = Flask(__name__)
 basedir = os.path.abspath(os.path.dirname(__file__))
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///week7_database.sqlite3"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["PAGE_SIZE"] = 50
+app.config["MAX_PAGE_SIZE"] = 500
+app.config["COUNT_CACHE_SECONDS"] = 60
+# Course catalog cache; point CATALOG_CACHE_STAMP at a file shared by all
+# worker processes to keep their caches coherent
+app.config["CATALOG_CACHE_SECONDS"] = 300
+app.config["CATALOG_CACHE_STAMP"] = os.environ.get("CATALOG_CACHE_STAMP")
+# Rendered listing and detail pages (see page_cache.py); PAGE_CACHE_STAMP
+# plays the same role as CATALOG_CACHE_STAMP
+app.config["PAGE_CACHE_SECONDS"] = 300
+app.config["PAGE_CACHE_STAMP"] = os.environ.get("PAGE_CACHE_STAMP")
+# Per-request Server-Timing header and /metrics (see profiling.py); requests
+# slower than SLOW_REQUEST_MS are logged with their SQL
+app.config["PROFILING"] = os.environ.get("PROFILING", "0") == "1"
+app.config["SLOW_REQUEST_MS"] = int(os.environ.get("SLOW_REQUEST_MS", "0")) or None
+# SQLite tuning, applied to every new connection (see sqlite_tuning.py)
+app.config["SQLITE_PRAGMAS"] = sqlite_pragmas()
 db = SQLAlchemy(app)
 api = Api(app)
+init_query_counter(app)
+init_profiling(app)
+
+apply_sqlite_pragmas = pragma_listener(app)
+
+with app.app_context():
+    event.listen(db.engine, "connect", apply_sqlite_pragmas)
+    init_search(db)
+    init_course_stats(db)
 
 # Database Models
 class Student(db.Model):
@@ -30,9 +68,91 @@ class Enrollment(db.Model):
     enrollment_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     estudent_id = db.Column(db.Integer, db.ForeignKey("student.student_id"), nullable=False)
     ecourse_id = db.Column(db.Integer, db.ForeignKey("course.course_id"), nullable=False)
+    __table_args__ = (
+        db.Index("uq_enrollments_student_course", "estudent_id", "ecourse_id", unique=True),
+        db.Index("ix_enrollments_course_student", "ecourse_id", "estudent_id"),
+    )
     student = db.relationship("Student", backref=db.backref("enrollments", cascade="all, delete-orphan"))
     course = db.relationship("Course", backref=db.backref("enrollments", cascade="all, delete-orphan"))
 
+# Keyset pagination: a page is "the next `size` rows with a primary key
+# greater than `after`", which is an index range scan however deep the page.
+def page_args():
+    after = request.args.get("after", 0, type=int)
+    size = request.args.get("size", app.config["PAGE_SIZE"], type=int)
+    size = max(1, min(size, app.config["MAX_PAGE_SIZE"]))
+    return after, size
+
+def keyset_page(model, key, after, size):
+    rows = model.query.filter(key > after).order_by(key).limit(size + 1).all()
+    next_after = getattr(rows[size - 1], key.key) if len(rows) > size else None
+    return rows[:size], next_after
+
+# Search box on the listings: ranked full-text matches (see search_index.py),
+# paged by offset because rank order has no key to continue from.
+def search_listing(kind, q):
+    size = page_args()[1]
+    offset = max(0, request.args.get("offset", 0, type=int))
+    rows = db.session.execute(search_statement(kind, match_expression(q), size, offset)).all()
+    results, next_offset = search_page(rows, size, offset)
+    return results, next_offset, size, offset
+
+# Row counts are cached for COUNT_CACHE_SECONDS and dropped on writes, so
+# listings do not run COUNT(*) on every request.
+_count_cache = {}
+
+def cached_count(model):
+    entry = _count_cache.get(model)
+    now = time.monotonic()
+    if entry is None or now - entry[1] > app.config["COUNT_CACHE_SECONDS"]:
+        entry = (model.query.count(), now)
+        _count_cache[model] = entry
+    return entry[0]
+
+def invalidate_count(model):
+    _count_cache.pop(model, None)
+
+# The course catalog as plain rows ordered by course_id, loaded once and
+# shared by every request until a course is created, changed or deleted.
+def load_catalog():
+    return db.session.execute(
+        select(Course.course_id, Course.course_code, Course.course_name, Course.course_description)
+        .order_by(Course.course_id)
+    ).all()
+
+catalog = CatalogCache(load_catalog, ttl=app.config["CATALOG_CACHE_SECONDS"],
+                       stamp=app.config["CATALOG_CACHE_STAMP"])
+
+# Every write route calls pages.invalidate() after it commits
+pages = PageCache(ttl=app.config["PAGE_CACHE_SECONDS"], stamp=app.config["PAGE_CACHE_STAMP"])
+
+# keyset_page() over the cached catalog
+def catalog_page(after, size):
+    courses = catalog.get()
+    start = bisect.bisect_right(courses, after, key=lambda c: c.course_id)
+    page = courses[start:start + size]
+    next_after = page[-1].course_id if start + size < len(courses) else None
+    return page, next_after, len(courses)
+
+# Apply only the difference between a student's current and requested
+# courses: one bulk DELETE for dropped courses, one executemany INSERT for new
+# ones, and no writes at all when the selection did not change.
+def sync_enrollments(student_id, course_ids):
+    wanted = {int(course_id) for course_id in course_ids}
+    current = {course_id for course_id, in db.session.query(Enrollment.ecourse_id).filter_by(estudent_id=student_id)}
+    dropped = current - wanted
+    added = wanted - current
+    if dropped:
+        Enrollment.query.filter(
+            Enrollment.estudent_id == student_id,
+            Enrollment.ecourse_id.in_(dropped),
+        ).delete(synchronize_session=False)
+    if added:
+        db.session.execute(insert(Enrollment), [
+            {"estudent_id": student_id, "ecourse_id": course_id} for course_id in sorted(added)
+        ])
+    return added, dropped
+
 # RESTful Resources for Update and Delete
 class StudentUpdateAPI(Resource):
     def post(self, student_id):
@@ -41,13 +161,15 @@ class StudentUpdateAPI(Resource):
         student.first_name = data["f_name"]
         student.last_name = data["l_name"]
         
-        # Update enrollments
-        Enrollment.query.filter_by(estudent_id=student_id).delete()
-        for course_id in data.getlist("courses"):
-            enrollment = Enrollment(estudent_id=student.student_id, ecourse_id=int(course_id))
-            db.session.add(enrollment)
-
-        db.session.commit()
+        # A course id that is not an integer, or not in the course table,
+        # fails the whole update
+        try:
+            sync_enrollments(student_id, data.getlist("courses"))
+            db.session.commit()
+        except (ValueError, IntegrityError):
+            db.session.rollback()
+            return {"message": "Unknown course."}, 400
+        pages.invalidate()
         return {"message": "Student updated successfully"}, 200
 
 class StudentDeleteAPI(Resource):
@@ -55,6 +177,8 @@ class StudentDeleteAPI(Resource):
         student = Student.query.get_or_404(student_id)
         db.session.delete(student)
         db.session.commit()
+        invalidate_count(Student)
+        pages.invalidate()
         return {"message": "Student deleted successfully"}, 200
 
 class CourseUpdateAPI(Resource):
@@ -64,6 +188,8 @@ class CourseUpdateAPI(Resource):
         course.course_name = data["c_name"]
         course.course_description = data["desc"]
         db.session.commit()
+        catalog.invalidate()
+        pages.invalidate()
         return {"message": "Course updated successfully"}, 200
 
 class CourseDeleteAPI(Resource):
@@ -71,6 +197,8 @@ class CourseDeleteAPI(Resource):
         course = Course.query.get_or_404(course_id)
         db.session.delete(course)
         db.session.commit()
+        catalog.invalidate()
+        pages.invalidate()
         return {"message": "Course deleted successfully"}, 200
 
 # Add Resources to API
@@ -81,9 +209,33 @@ api.add_resource(CourseDeleteAPI, "/course/<int:course_id>/delete")
 
 # Routes for HTML pages
 @app.route('/')
+@pages.cached()
 def index():
-    students = Student.query.all()
-    return render_template('index.html', students=students), 200
+    q = request.args.get("q", "")
+    if match_expression(q):
+        students, next_offset, size, start = search_listing("student", q)
+        return render_template('index.html', students=students, q=q, next_offset=next_offset,
+                               size=size, start=start), 200
+    after, size = page_args()
+    start = request.args.get("start", 0, type=int)
+    students, next_after = keyset_page(Student, Student.student_id, after, size)
+    return render_template('index.html', students=students, next_after=next_after,
+                           size=size, start=start, total=cached_count(Student)), 200
+
+@app.route('/api/students')
+def list_students():
+    after, size = page_args()
+    students, next_after = keyset_page(Student, Student.student_id, after, size)
+    return jsonify({
+        "students": [{
+            "student_id": s.student_id,
+            "roll_number": s.roll_number,
+            "first_name": s.first_name,
+            "last_name": s.last_name,
+        } for s in students],
+        "next_after": next_after,
+        "total": cached_count(Student),
+    }), 200
 
 @app.route('/student/create', methods=['GET', 'POST'])
 def create_student():
@@ -91,20 +243,25 @@ def create_student():
         roll = request.form['roll']
         first_name = request.form['f_name']
         last_name = request.form['l_name']
-        
-        if Student.query.filter_by(roll_number=roll).first():
+
+        # One INSERT; the UNIQUE roll_number rejects duplicates
+        db.session.add(Student(roll_number=roll, first_name=first_name, last_name=last_name))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
             return render_template('error.html', message="Roll number already exists."), 409
-        
-        student = Student(roll_number=roll, first_name=first_name, last_name=last_name)
-        db.session.add(student)
-        db.session.commit()
+        invalidate_count(Student)
+        pages.invalidate()
         return redirect(url_for('index')), 200
     return render_template('add_student.html'), 200
 
 @app.route('/student/<int:student_id>')
+@pages.cached()
 def student_detail(student_id):
     student = Student.query.get_or_404(student_id)
-    enrollments = Enrollment.query.filter_by(estudent_id=student_id).all()
+    # Load each enrollment's course in the same query; the template reads enrollment.course
+    enrollments = Enrollment.query.options(joinedload(Enrollment.course)).filter_by(estudent_id=student_id).all()
     return render_template('student_details.html', student=student, enrollments=enrollments), 200
 
 @app.route('/student/<int:student_id>/withdraw/<int:course_id>')
@@ -113,12 +270,40 @@ def withdraw_course(student_id, course_id):
     if enrollment:
         db.session.delete(enrollment)
         db.session.commit()
+        pages.invalidate()
     return redirect(url_for('student_detail', student_id=student_id)), 200
 
 @app.route('/courses')
+@pages.cached()
 def courses():
-    courses = Course.query.all()
-    return render_template('courses.html', courses=courses), 200
+    q = request.args.get("q", "")
+    if match_expression(q):
+        courses, next_offset, size, start = search_listing("course", q)
+        return render_template('courses.html', courses=courses, q=q, next_offset=next_offset,
+                               size=size, start=start,
+                               counts=enrollment_counts(db.session, (c.course_id for c in courses))), 200
+    after, size = page_args()
+    start = request.args.get("start", 0, type=int)
+    courses, next_after, total = catalog_page(after, size)
+    # Headcounts for this page only, one primary-key lookup per course
+    counts = enrollment_counts(db.session, (c.course_id for c in courses))
+    return render_template('courses.html', courses=courses, next_after=next_after,
+                           size=size, start=start, total=total, counts=counts), 200
+
+@app.route('/api/courses')
+def list_courses():
+    after, size = page_args()
+    courses, next_after, total = catalog_page(after, size)
+    return jsonify({
+        "courses": [{
+            "course_id": c.course_id,
+            "course_code": c.course_code,
+            "course_name": c.course_name,
+            "course_description": c.course_description,
+        } for c in courses],
+        "next_after": next_after,
+        "total": total,
+    }), 200
 
 @app.route('/course/create', methods=['GET', 'POST'])
 def create_course():
@@ -126,21 +311,28 @@ def create_course():
         code = request.form['code']
         name = request.form['c_name']
         desc = request.form['desc']
-        
-        if Course.query.filter_by(course_code=code).first():
+
+        # One INSERT; the UNIQUE course_code rejects duplicates
+        db.session.add(Course(course_code=code, course_name=name, course_description=desc))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
             return render_template('error.html', message="Course code already exists."), 409
-        
-        course = Course(course_code=code, course_name=name, course_description=desc)
-        db.session.add(course)
-        db.session.commit()
+        catalog.invalidate()
+        pages.invalidate()
         return redirect(url_for('courses')), 200
     return render_template('add_course.html'), 200
 
 @app.route('/course/<int:course_id>')
+@pages.cached()
 def course_detail(course_id):
     course = Course.query.get_or_404(course_id)
-    enrollments = Enrollment.query.filter_by(ecourse_id=course_id).all()
-    return render_template('course_details.html', course=course, enrollments=enrollments), 200
+    # Load each enrollment's student in the same query; the template reads enrollment.student
+    enrollments = Enrollment.query.options(joinedload(Enrollment.student)).filter_by(ecourse_id=course_id).all()
+    # Every enrollment is loaded for the table anyway, so no course_stats lookup
+    return render_template('course_details.html', course=course, enrollments=enrollments,
+                           headcount=len(enrollments)), 200
 
 @app.route('/course/<int:course_id>/update', methods=['GET', 'POST'])
 def update_course(course_id):
@@ -149,6 +341,8 @@ def update_course(course_id):
         course.course_name = request.form['c_name']
         course.course_description = request.form['desc']
         db.session.commit()
+        catalog.invalidate()
+        pages.invalidate()
         return redirect(url_for('courses')), 200
     return render_template('update_course.html', course=course), 200
 
@@ -159,20 +353,24 @@ def update_student(student_id):
         student.first_name = request.form['f_name']
         student.last_name = request.form['l_name']
         
-        # Update enrollments
-        Enrollment.query.filter_by(estudent_id=student_id).delete()
-        selected_courses = request.form.getlist('courses')
-        
-        for course_id in selected_courses:
-            enrollment = Enrollment(estudent_id=student.student_id, ecourse_id=int(course_id))
-            db.session.add(enrollment)
-
-        db.session.commit()
+        # A course id that is not an integer, or not in the course table,
+        # fails the whole update
+        try:
+            sync_enrollments(student_id, request.form.getlist('courses'))
+            db.session.commit()
+        except (ValueError, IntegrityError):
+            db.session.rollback()
+            return render_template('error.html', message="Unknown course."), 400
+        pages.invalidate()
         return redirect(url_for('index')), 200
     else:
-        courses = Course.query.all()
+        courses = catalog.get()
         enrolled_courses = [e.ecourse_id for e in Enrollment.query.filter_by(estudent_id=student_id).all()]
         return render_template('update_student.html', student=student, courses=courses, enrolled_courses=enrolled_courses), 200
 
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({"catalog": catalog.stats(), "pages": pages.stats()}), 200
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+
+# Read-through cache for small tables that are read on most pages but rarely
+# written, such as the course catalog.
+#
+# get() returns the cached value and calls `loader` again once the value is
+# older than `ttl` seconds or after invalidate().  Writers call invalidate()
+# after they commit.
+#
+# If several worker processes serve the same database, give every process's
+# cache the same `stamp` file path.  invalidate() bumps that file's mtime, and
+# each get() compares it (one stat call) with the mtime seen at load time, so
+# a write in one process is picked up by every other process on its next
+# read.  Without a stamp the other processes only reload after the TTL.
+#
+# stats() returns hit/miss/invalidation counters for monitoring.
+
+
+class CatalogCache:
+    def __init__(self, loader, ttl=300, stamp=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.stamp = stamp
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._value = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def _stamp_mtime(self):
+        if self.stamp is None:
+            return None
+        try:
+            return os.stat(self.stamp).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        # Taken before loading: a write that invalidates while we load
+        # leaves the value tagged with the old version, so it is reloaded on
+        # the next get() rather than served until the TTL runs out.
+        version = (self._generation, self._stamp_mtime())
+        with self._lock:
+            if (
+                self._version == version
+                and time.monotonic() - self._loaded_at < self.ttl
+            ):
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            self._value = self.loader()
+            self._version = version
+            self._loaded_at = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._value = None
+            self._version = None
+        if self.stamp is not None:
+            # Strictly increasing even if the clock or the filesystem's
+            # timestamp resolution would repeat the previous value
+            now = max(time.time_ns(), (self._stamp_mtime() or 0) + 1000)
+            with open(self.stamp, "a"):
+                os.utime(self.stamp, ns=(now, now))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 3)
+            if self._version is not None
+            else None,
+            "ttl_seconds": self.ttl,
+            "shared": self.stamp is not None,
+        }
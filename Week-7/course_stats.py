@@ -0,0 +1,123 @@
+import sys
+from sqlalchemy import column, event, select, table
+
+# Per-course aggregates, kept up to date by the database.
+#
+# course_stats holds one row per course.  Triggers add the row with the
+# course, add or subtract one from enrollment_count for every enrollment
+# inserted, deleted or moved, and drop the row with the course.  Every path
+# that changes enrollments (the ORM cascades when a student or course is
+# deleted, the bulk DELETE/INSERT in sync_enrollments, plain SQL) therefore
+# keeps it exact in the same transaction, and a headcount is a primary-key
+# lookup instead of counting enrollments.
+#
+# Another aggregate is another column here, in RECOUNT and in the triggers.
+#
+#   python course_stats.py           # compare the table with a recount
+#   python course_stats.py --repair  # and rebuild it from the recount
+
+course_stats = table("course_stats", column("course_id"), column("enrollment_count"))
+
+CREATE_STATS = (
+    "CREATE TABLE IF NOT EXISTS course_stats ("
+    " course_id INTEGER PRIMARY KEY,"
+    " enrollment_count INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TRIGGER IF NOT EXISTS course_stats_course_insert AFTER INSERT ON course BEGIN "
+    "INSERT OR IGNORE INTO course_stats (course_id) VALUES (new.course_id); END",
+    "CREATE TRIGGER IF NOT EXISTS course_stats_course_delete AFTER DELETE ON course BEGIN "
+    "DELETE FROM course_stats WHERE course_id = old.course_id; END",
+    "CREATE TRIGGER IF NOT EXISTS course_stats_enrollment_insert AFTER INSERT ON enrollments BEGIN "
+    "INSERT INTO course_stats (course_id, enrollment_count) VALUES (new.ecourse_id, 1) "
+    "ON CONFLICT (course_id) DO UPDATE SET enrollment_count = enrollment_count + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS course_stats_enrollment_delete AFTER DELETE ON enrollments BEGIN "
+    "UPDATE course_stats SET enrollment_count = enrollment_count - 1 WHERE course_id = old.ecourse_id; END",
+    "CREATE TRIGGER IF NOT EXISTS course_stats_enrollment_update AFTER UPDATE OF ecourse_id ON enrollments BEGIN "
+    "UPDATE course_stats SET enrollment_count = enrollment_count - 1 WHERE course_id = old.ecourse_id; "
+    "INSERT INTO course_stats (course_id, enrollment_count) VALUES (new.ecourse_id, 1) "
+    "ON CONFLICT (course_id) DO UPDATE SET enrollment_count = enrollment_count + 1; END",
+)
+
+RECOUNT = (
+    "SELECT course.course_id, count(enrollments.enrollment_id) FROM course "
+    "LEFT JOIN enrollments ON enrollments.ecourse_id = course.course_id "
+    "GROUP BY course.course_id"
+)
+
+TRIGGERS = ("course_insert", "course_delete", "enrollment_insert", "enrollment_delete", "enrollment_update")
+
+
+def _tables(conn):
+    return {name for name, in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def rebuild_course_stats(conn):
+    conn.exec_driver_sql("DELETE FROM course_stats")
+    conn.exec_driver_sql("INSERT INTO course_stats (course_id, enrollment_count) " + RECOUNT)
+
+
+# Creates the table and triggers, filled from the current enrollments, once
+# the course and enrollments tables exist; safe to run on every start
+def create_course_stats(conn):
+    existing = _tables(conn)
+    if not {"course", "enrollments"} <= existing or "course_stats" in existing:
+        return
+    for statement in CREATE_STATS:
+        conn.exec_driver_sql(statement)
+    rebuild_course_stats(conn)
+
+
+def drop_course_stats(conn):
+    # The triggers belong to course and enrollments, not to course_stats
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS course_stats_%s" % trigger)
+    conn.exec_driver_sql("DROP TABLE IF EXISTS course_stats")
+
+
+# Sets up course_stats on `db`'s database now, and again whenever
+# db.create_all() creates the tables (db.drop_all() drops it)
+def init_course_stats(db):
+    event.listen(db.metadata, "after_create", lambda target, conn, **kw: create_course_stats(conn))
+    event.listen(db.metadata, "before_drop", lambda target, conn, **kw: drop_course_stats(conn))
+    with db.engine.begin() as conn:
+        create_course_stats(conn)
+
+
+# {course_id: enrollment count} for the given courses
+def enrollment_counts(session, course_ids):
+    rows = session.execute(
+        select(course_stats.c.course_id, course_stats.c.enrollment_count)
+        .where(course_stats.c.course_id.in_(list(course_ids)))
+    )
+    return dict(rows.all())
+
+
+# Compares course_stats with a fresh recount and returns the courses that
+# differ as {course_id: (stored, recounted)}, None meaning no row.  With
+# repair=True the table is then rebuilt from the recount.
+def check_course_stats(conn, repair=False):
+    expected = dict(conn.exec_driver_sql(RECOUNT).all())
+    stored = dict(conn.exec_driver_sql("SELECT course_id, enrollment_count FROM course_stats").all())
+    drift = {
+        course_id: (stored.get(course_id), expected.get(course_id))
+        for course_id in sorted(expected.keys() | stored.keys())
+        if stored.get(course_id) != expected.get(course_id)
+    }
+    if repair and drift:
+        rebuild_course_stats(conn)
+    return drift
+
+
+if __name__ == "__main__":
+    from app import app, db
+
+    repair = "--repair" in sys.argv[1:]
+    with app.app_context(), db.engine.begin() as conn:
+        drift = check_course_stats(conn, repair=repair)
+    for course_id, (stored, recounted) in drift.items():
+        print("course %d: course_stats has %s, recount gives %s" % (course_id, stored, recounted))
+    if not drift:
+        print("course_stats matches the enrollments")
+    elif repair:
+        print("rebuilt course_stats (%d courses were wrong)" % len(drift))
+    else:
+        sys.exit(1)
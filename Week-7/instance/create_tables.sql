@@ -23,6 +23,10 @@ CREATE TABLE enrollments (
     FOREIGN KEY (ecourse_id) REFERENCES course(course_id)
 );
 
+-- Lookups by student, by course and by (student, course)
+CREATE UNIQUE INDEX uq_enrollments_student_course ON enrollments (estudent_id, ecourse_id);
+CREATE INDEX ix_enrollments_course_student ON enrollments (ecourse_id, estudent_id);
+
 -- Insert sample data into the Course table
 INSERT INTO course (course_name, course_code, course_description) VALUES
 ('Mathematics', 'MATH101', 'Basic Mathematics course'),
@@ -0,0 +1,134 @@
+import gzip
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, make_response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Rendered-page cache.
+#
+# Views wrapped with @cached() keep their rendered 200 text/html responses,
+# keyed by endpoint, view arguments, query string and the data version.
+# Write routes call invalidate() after they commit, which bumps the version,
+# so no page rendered from older data matches any more.  Entries also expire
+# after `ttl` seconds, and the least recently used are dropped beyond
+# `max_entries`.
+#
+# Each body is compressed once when it is stored, with gzip and, if the
+# brotli package is installed, brotli.  A hit is served in the best encoding
+# the request's Accept-Encoding allows, without compressing again.
+#
+# As with CatalogCache, worker processes that share a database should share
+# a `stamp` file: invalidate() bumps its mtime, and it is part of the
+# version every process checks.
+#
+# stats() returns hit/miss/invalidation counters for monitoring.
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(body):
+    bodies = {"identity": body, "gzip": gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=9)
+    return bodies
+
+
+class PageCache:
+    def __init__(self, ttl=300, stamp=None, max_entries=1024):
+        self.ttl = ttl
+        self.stamp = stamp
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._entries = OrderedDict()  # key -> (version, stored at, content type, bodies)
+
+    def _stamp_mtime(self):
+        if self.stamp is None:
+            return None
+        try:
+            return os.stat(self.stamp).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def version(self):
+        return (self._generation, self._stamp_mtime())
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.invalidations += 1
+        if self.stamp is not None:
+            # Strictly increasing even if the clock or the filesystem's
+            # timestamp resolution would repeat the previous value (as in
+            # CatalogCache.invalidate)
+            now = max(time.time_ns(), (self._stamp_mtime() or 0) + 1000)
+            with open(self.stamp, "a"):
+                os.utime(self.stamp, ns=(now, now))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "encodings": list(ENCODINGS),
+            }
+
+    def _lookup(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _respond(entry):
+        _, _, content_type, bodies = entry
+        encoding = next((e for e in ENCODINGS if request.accept_encodings[e]), "identity")
+        response = Response(bodies[encoding], content_type=content_type)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
+
+    def cached(self):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = (request.endpoint, tuple(sorted(kwargs.items())),
+                       tuple(sorted(request.args.items(multi=True))))
+                # Read before rendering: a write that lands meanwhile makes
+                # this entry stale rather than letting it pass as current
+                version = self.version()
+                entry = self._lookup(key, version)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.mimetype != "text/html":
+                        return response
+                    entry = (version, time.monotonic(), response.content_type, compress(response.get_data()))
+                    self._store(key, entry)
+                return self._respond(entry)
+            return wrapper
+        return decorator
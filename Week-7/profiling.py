@@ -0,0 +1,162 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request profiling, enabled with PROFILING=True.
+#
+# Every request records its SQL statement count and time (engine events),
+# template render time (Flask's template signals) and total handler time.
+# These go out in a Server-Timing header, which browser dev tools show next
+# to the request, and are added to per-endpoint histograms that /metrics
+# serves in the Prometheus text format.
+#
+# With SLOW_REQUEST_MS set, a request that takes longer than that is logged
+# as a warning together with every SQL statement it ran and how long each
+# one took.  Statements are only kept while the slow log is on.
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+MAX_LOGGED_STATEMENTS = 100
+
+METRICS = (
+    # name, help, buckets, timing key
+    ("app_request_duration_seconds", "Total time spent handling the request.", DURATION_BUCKETS, "total"),
+    ("app_sql_duration_seconds", "Time spent executing SQL per request.", DURATION_BUCKETS, "sql"),
+    ("app_template_duration_seconds", "Time spent rendering templates per request.", DURATION_BUCKETS, "template"),
+    ("app_sql_queries", "SQL statements executed per request.", QUERY_BUCKETS, "queries"),
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (metric name, endpoint) -> Histogram
+
+    def observe(self, endpoint, timings):
+        with self._lock:
+            for name, _, buckets, key in METRICS:
+                histogram = self._histograms.get((name, endpoint))
+                if histogram is None:
+                    histogram = self._histograms[(name, endpoint)] = Histogram(buckets)
+                histogram.observe(timings[key])
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, help_text, buckets, _ in METRICS:
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s histogram" % name)
+                for (metric, endpoint), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    label = 'endpoint="%s"' % endpoint.replace("\\", "\\\\").replace('"', '\\"')
+                    cumulative = 0
+                    for bound, count in zip(buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append('%s_bucket{%s,le="%s"} %d' % (name, label, bound, cumulative))
+                    lines.append("%s_sum{%s} %r" % (name, label, histogram.sum))
+                    lines.append("%s_count{%s} %d" % (name, label, cumulative))
+        return "\n".join(lines) + "\n"
+
+
+def _profile():
+    if has_request_context():
+        return g.get("profile")
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _profile() is not None:
+        context._profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile()
+    start = getattr(context, "_profile_start", None)
+    if profile is None or start is None:
+        return
+    elapsed = time.perf_counter() - start
+    profile["queries"] += 1
+    profile["sql"] += elapsed
+    statements = profile["statements"]
+    if statements is not None and len(statements) < MAX_LOGGED_STATEMENTS:
+        statements.append((elapsed, statement, parameters))
+
+
+def _before_render(sender, template, context, **extra):
+    profile = _profile()
+    if profile is not None:
+        profile["template_start"] = time.perf_counter()
+
+
+def _rendered(sender, template, context, **extra):
+    profile = _profile()
+    if profile is not None and "template_start" in profile:
+        profile["template"] += time.perf_counter() - profile.pop("template_start")
+
+
+def init_profiling(app):
+    if not app.config.get("PROFILING"):
+        return None
+    registry = Registry()
+    for name, listener in (("before_cursor_execute", _before_cursor_execute),
+                           ("after_cursor_execute", _after_cursor_execute)):
+        if not event.contains(Engine, name, listener):
+            event.listen(Engine, name, listener)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.before_request
+    def start_profile():
+        g.profile = {
+            "start": time.perf_counter(),
+            "queries": 0,
+            "sql": 0.0,
+            "template": 0.0,
+            "statements": [] if app.config.get("SLOW_REQUEST_MS") else None,
+        }
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop("profile", None)
+        if profile is None or request.endpoint == "metrics":
+            return response
+        profile["total"] = time.perf_counter() - profile["start"]
+        python = max(0.0, profile["total"] - profile["sql"] - profile["template"])
+        response.headers["Server-Timing"] = (
+            'sql;dur=%.2f;desc="%d queries", tpl;dur=%.2f, py;dur=%.2f, total;dur=%.2f'
+            % (profile["sql"] * 1000, profile["queries"], profile["template"] * 1000,
+               python * 1000, profile["total"] * 1000)
+        )
+        endpoint = request.endpoint or "none"
+        registry.observe(endpoint, profile)
+
+        slow_ms = app.config.get("SLOW_REQUEST_MS")
+        if slow_ms and profile["total"] * 1000 > slow_ms:
+            lines = ["slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, templates %.1f ms" % (
+                request.method, request.full_path, endpoint, profile["total"] * 1000,
+                profile["queries"], profile["sql"] * 1000, profile["template"] * 1000)]
+            for elapsed, statement, parameters in profile["statements"]:
+                lines.append("  %8.2f ms  %s  %.200r" % (elapsed * 1000, " ".join(statement.split()), parameters))
+            app.logger.warning("\n".join(lines))
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    return registry
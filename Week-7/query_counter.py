@@ -0,0 +1,43 @@
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Test-mode SQL statement counter.
+#
+# While the app runs with TESTING=True every response carries the number of
+# statements it executed in an X-Query-Count header.  If QUERY_BUDGET is set
+# (an int, or a dict of endpoint name -> int) a request that goes over its
+# budget raises QueryBudgetExceeded, failing the test that made it.  A page
+# whose query count grows with the number of rows (N+1 lazy loads) trips the
+# budget as soon as the test data has more rows than the budget allows.
+#
+# tools/check_query_budget.py runs the HTML pages against their budgets.
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _count(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and current_app.config.get("TESTING"):
+        g.query_count = g.get("query_count", 0) + 1
+
+
+def init_query_counter(app):
+    if not event.contains(Engine, "before_cursor_execute", _count):
+        event.listen(Engine, "before_cursor_execute", _count)
+
+    @app.after_request
+    def check_query_budget(response):
+        if not app.config.get("TESTING"):
+            return response
+        count = g.get("query_count", 0)
+        response.headers["X-Query-Count"] = str(count)
+        budget = app.config.get("QUERY_BUDGET")
+        if isinstance(budget, dict):
+            budget = budget.get(request.endpoint)
+        if budget is not None and count > budget:
+            raise QueryBudgetExceeded(
+                "%s ran %d queries, budget is %d" % (request.endpoint, count, budget)
+            )
+        return response
@@ -0,0 +1,42 @@
+import argparse
+import json
+import sys
+
+from bench_http import MIXES, bench_app
+
+# Week-6 on its WSGI (app.py, werkzeug threaded server) and ASGI (asgi.py,
+# uvicorn + aiosqlite) deployments, at increasing numbers of concurrent
+# keep-alive clients.  Uses bench_http.py's server and load generator with
+# its Week-6 route mix.
+#
+#   python tools/bench_asgi.py [--clients 8,64,256] [--duration 10] [--out asgi.json]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Week-6 WSGI vs ASGI under concurrency")
+    parser.add_argument("--clients", default="8,64,256", help="comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out")
+    args = parser.parse_args(argv)
+
+    results = []
+    print("%-6s %8s %9s %7s %9s %9s %9s" % ("server", "clients", "req/s", "errors", "p50 ms", "p95 ms", "p99 ms"))
+    for clients in [int(c) for c in args.clients.split(",")]:
+        for server in ("wsgi", "asgi"):
+            run = argparse.Namespace(threads=clients, server=server, duration=args.duration,
+                                     warmup=args.warmup, rows=args.rows, seed=args.seed)
+            r = bench_app("Week-6", MIXES["Week-6"], run)["overall"]
+            results.append(dict(r, server=server, clients=clients))
+            print("%-6s %8d %9.1f %7d %9.2f %9.2f %9.2f" % (
+                server, clients, r["rps"], r["errors"], r["p50_ms"] or 0, r["p95_ms"] or 0, r["p99_ms"] or 0))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from migrate_enrollments import migrate
+
+# Enrollment lookup latency with and without the indexes added by
+# migrate_enrollments.py, on a Week-7 style schema.
+#
+#   python tools/bench_enrollment_indexes.py [enrollments] [lookups]
+
+SCHEMA = """
+CREATE TABLE student (student_id INTEGER PRIMARY KEY AUTOINCREMENT, roll_number TEXT UNIQUE NOT NULL,
+                      first_name TEXT NOT NULL, last_name TEXT);
+CREATE TABLE course (course_id INTEGER PRIMARY KEY AUTOINCREMENT, course_name TEXT NOT NULL,
+                     course_code TEXT UNIQUE NOT NULL, course_description TEXT);
+CREATE TABLE enrollments (enrollment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                          estudent_id INTEGER NOT NULL, ecourse_id INTEGER NOT NULL);
+"""
+
+QUERIES = {
+    "by student": "SELECT enrollment_id, ecourse_id FROM enrollments WHERE estudent_id = ?",
+    "by course": "SELECT enrollment_id, estudent_id FROM enrollments WHERE ecourse_id = ?",
+    "withdraw": "SELECT enrollment_id FROM enrollments WHERE estudent_id = ? AND ecourse_id = ?",
+}
+
+
+def populate(conn, enrollments, per_student=5, courses=2000):
+    students = enrollments // per_student
+    rng = random.Random(42)
+    with conn:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO course (course_id, course_name, course_code) VALUES (?, ?, ?)",
+            ((i, "Course %d" % i, "C%05d" % i) for i in range(1, courses + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO student (student_id, roll_number, first_name) VALUES (?, ?, ?)",
+            ((i, "R%07d" % i, "First%d" % i) for i in range(1, students + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO enrollments (estudent_id, ecourse_id) VALUES (?, ?)",
+            ((s, c) for s in range(1, students + 1)
+             for c in rng.sample(range(1, courses + 1), per_student)),
+        )
+    return students, courses
+
+
+def measure(conn, students, courses, lookups):
+    rng = random.Random(7)
+    keys = [(rng.randint(1, students), rng.randint(1, courses)) for _ in range(lookups)]
+    results = {}
+    for name, sql in QUERIES.items():
+        start = time.perf_counter()
+        for student_id, course_id in keys:
+            if name == "by student":
+                conn.execute(sql, (student_id,)).fetchall()
+            elif name == "by course":
+                conn.execute(sql, (course_id,)).fetchall()
+            else:
+                conn.execute(sql, (student_id, course_id)).fetchall()
+        results[name] = (time.perf_counter() - start) / lookups * 1e6
+    return results
+
+
+def main(argv):
+    enrollments = int(argv[0]) if argv else 1_000_000
+    lookups = int(argv[1]) if len(argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "bench.sqlite3"))
+        start = time.perf_counter()
+        students, courses = populate(conn, enrollments)
+        print("populated %d enrollments in %.1fs" % (enrollments, time.perf_counter() - start))
+
+        before = measure(conn, students, courses, lookups)
+        start = time.perf_counter()
+        migrate(conn)
+        print("migration took %.1fs" % (time.perf_counter() - start))
+        after = measure(conn, students, courses, lookups)
+        conn.close()
+
+    print("%-12s %14s %14s %9s" % ("lookup", "before (us)", "after (us)", "speedup"))
+    for name in QUERIES:
+        print("%-12s %14.1f %14.1f %8.0fx" % (name, before[name], after[name], before[name] / after[name]))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
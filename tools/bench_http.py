@@ -0,0 +1,348 @@
+import argparse
+import csv
+import http.client
+import importlib
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+# HTTP load test for the Week-4/5/6/7 apps.
+#
+# Each app is copied to a temp directory (so its database and files are
+# never touched), started on a free localhost port in a child process with
+# werkzeug's threaded server (or, with --server asgi, the app's asgi.py
+# under uvicorn), and driven by --threads client threads that
+# replay a weighted mix of the app's real routes over keep-alive
+# connections.  Requests made during --warmup are not counted.  For each
+# app it reports requests/s, errors and p50/p95/p99 latency, overall and per
+# route.
+#
+#   python tools/bench_http.py                              # all apps
+#   python tools/bench_http.py --apps Week-6 --threads 16 --duration 20
+#   python tools/bench_http.py --out new.json --baseline old.json --threshold 0.15
+#
+# With --baseline the run fails (exit status 1) if an app's throughput drops,
+# or its p95 latency grows, by more than --threshold compared to the saved
+# run.  --mix replaces the built-in route mixes with a JSON file of the same
+# shape as MIXES.  In paths and bodies, {student_id} and {course_id} become
+# random existing ids and {n} a number unique to the run.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MIXES = {
+    "Week-4": [
+        {"name": "GET /", "weight": 10, "method": "GET", "path": "/"},
+        {"name": "POST / student", "weight": 45, "method": "POST", "path": "/",
+         "form": {"ID": "student_id", "id_value": "{student_id}"}},
+        {"name": "POST / course", "weight": 45, "method": "POST", "path": "/",
+         "form": {"ID": "course_id", "id_value": "{course_id}"}},
+    ],
+    "Week-5": [
+        {"name": "GET /", "weight": 20, "method": "GET", "path": "/"},
+        {"name": "GET /student/<id>", "weight": 40, "method": "GET", "path": "/student/{student_id}"},
+        {"name": "GET /api/students", "weight": 15, "method": "GET", "path": "/api/students"},
+        {"name": "GET /student/<id>/update", "weight": 15, "method": "GET", "path": "/student/{student_id}/update"},
+        {"name": "POST /student/create", "weight": 10, "method": "POST", "path": "/student/create",
+         "form": {"roll": "LOAD{n}", "f_name": "Load", "l_name": "Test", "courses": ["{course_id}"]}},
+    ],
+    "Week-6": [
+        {"name": "GET /api/student/<id>", "weight": 35, "method": "GET", "path": "/api/student/{student_id}"},
+        {"name": "GET /api/course/<id>", "weight": 20, "method": "GET", "path": "/api/course/{course_id}"},
+        {"name": "GET /api/student/<id>/course", "weight": 20, "method": "GET",
+         "path": "/api/student/{student_id}/course"},
+        {"name": "GET /api/course", "weight": 5, "method": "GET", "path": "/api/course"},
+        {"name": "POST /api/student", "weight": 10, "method": "POST", "path": "/api/student",
+         "json": {"roll_number": "LOAD{n}", "first_name": "Load", "last_name": "Test"}},
+        {"name": "PUT /api/course/<id>", "weight": 10, "method": "PUT", "path": "/api/course/{course_id}",
+         "json": {"course_description": "Updated by load test {n}"}},
+    ],
+    "Week-7": [
+        {"name": "GET /", "weight": 15, "method": "GET", "path": "/"},
+        {"name": "GET /student/<id>", "weight": 30, "method": "GET", "path": "/student/{student_id}"},
+        {"name": "GET /course/<id>", "weight": 15, "method": "GET", "path": "/course/{course_id}"},
+        {"name": "GET /courses", "weight": 10, "method": "GET", "path": "/courses"},
+        {"name": "GET /api/students", "weight": 15, "method": "GET", "path": "/api/students"},
+        {"name": "POST /student/create", "weight": 10, "method": "POST", "path": "/student/create",
+         "form": {"roll": "LOAD{n}", "f_name": "Load", "l_name": "Test"}},
+        {"name": "POST /course/create", "weight": 5, "method": "POST", "path": "/course/create",
+         "form": {"code": "LOAD{n}", "c_name": "Load", "desc": "Created by load test"}},
+    ],
+}
+
+
+# Child process: serve one app copy
+
+def seed_rows(module, students):
+    # Tops the copied database up to `students` students, with one course
+    # per 100 students and 3 enrollments each, so the mix has rows to hit
+    from sqlalchemy import func, insert
+
+    db, Student, Course, Enrollment = module.db, module.Student, module.Course, module.Enrollment
+    have = db.session.query(func.count(Student.student_id)).scalar()
+    if have >= students:
+        return
+    courses = max(10, students // 100)
+    rng = random.Random(42)
+    db.session.execute(insert(Course), [
+        {"course_code": "BENCH%05d" % i, "course_name": "Bench %d" % i, "course_description": "Bench course"}
+        for i in range(courses)
+    ])
+    db.session.execute(insert(Student), [
+        {"roll_number": "BENCH%07d" % i, "first_name": "Bench", "last_name": str(i)}
+        for i in range(students - have)
+    ])
+    student_ids = [i for i, in db.session.query(Student.student_id).filter(Student.roll_number.like("BENCH%"))]
+    course_ids = [i for i, in db.session.query(Course.course_id).filter(Course.course_code.like("BENCH%"))]
+    columns = Enrollment.__table__.c.keys()
+    student_col = next(c for c in columns if c.endswith("student_id"))
+    course_col = next(c for c in columns if c.endswith("course_id"))
+    db.session.execute(insert(Enrollment), [
+        {student_col: s, course_col: c} for s in student_ids for c in rng.sample(course_ids, 3)
+    ])
+    db.session.commit()
+
+
+def serve(directory, students, server_kind="wsgi"):
+    os.chdir(directory)
+    sys.path.insert(0, directory)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    module = importlib.import_module("app")
+    app = module.app
+    if hasattr(module, "db"):
+        with app.app_context():
+            module.db.create_all()
+            seed_rows(module, students)
+            ids = {
+                "student_id": [i for i, in module.db.session.query(module.Student.student_id)],
+                "course_id": [i for i, in module.db.session.query(module.Course.course_id)],
+            }
+    else:
+        with open("data.csv") as f:
+            rows = [[v.strip() for v in row] for row in csv.reader(f)][1:]
+        ids = {
+            "student_id": sorted({row[0] for row in rows if row}),
+            "course_id": sorted({row[1] for row in rows if row}),
+        }
+
+    if server_kind == "asgi":
+        # The app's asgi.py module (Week-6) behind uvicorn
+        import uvicorn
+
+        # IPPROTO_TCP explicitly: asyncio only sets TCP_NODELAY on accepted
+        # sockets whose proto says TCP, and without it Nagle's algorithm and
+        # delayed ACKs add ~40 ms to every response
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(importlib.import_module("asgi").app, log_level="warning"))
+        print(json.dumps({"port": sock.getsockname()[1], "ids": ids}), flush=True)
+        server.run(sockets=[sock])
+        return
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"  # keep-alive
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    print(json.dumps({"port": server.server_port, "ids": ids}), flush=True)
+    server.serve_forever()
+
+
+# Parent process: load generator
+
+def fill(value, rng, ids, counter):
+    if isinstance(value, str):
+        return value.format(
+            student_id=rng.choice(ids["student_id"]),
+            course_id=rng.choice(ids["course_id"]),
+            n="%d_%d" % (os.getpid(), next(counter)),
+        )
+    if isinstance(value, list):
+        return [fill(v, rng, ids, counter) for v in value]
+    if isinstance(value, dict):
+        return {k: fill(v, rng, ids, counter) for k, v in value.items()}
+    return value
+
+
+def request_args(entry, rng, ids, counter):
+    path = fill(entry["path"], rng, ids, counter)
+    if "json" in entry:
+        body = json.dumps(fill(entry["json"], rng, ids, counter))
+        return path, body, {"Content-Type": "application/json"}
+    if "form" in entry:
+        body = urlencode(fill(entry["form"], rng, ids, counter), doseq=True)
+        return path, body, {"Content-Type": "application/x-www-form-urlencoded"}
+    return path, None, {}
+
+
+def client(port, mix, ids, seed, counter, warm_at, deadline, samples):
+    rng = random.Random(seed)
+    weights = [entry["weight"] for entry in mix]
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        entry = rng.choices(mix, weights)[0]
+        path, body, headers = request_args(entry, rng, ids, counter)
+        start = time.perf_counter()
+        try:
+            conn.request(entry["method"], path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 500
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+        if start >= warm_at:
+            samples.append((entry["name"], time.perf_counter() - start, ok))
+    conn.close()
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summarize(latencies, errors, seconds):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / seconds, 1),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3) if ordered else None,
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3) if ordered else None,
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3) if ordered else None,
+    }
+
+
+def bench_app(name, mix, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, name)
+        shutil.copytree(os.path.join(ROOT, name), directory,
+                        ignore=shutil.ignore_patterns("__pycache__", "*.snapshot", "charts"))
+        child = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", directory, "--rows", str(args.rows),
+             "--server", args.server],
+            stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            ready = json.loads(child.stdout.readline())
+            samples = []
+            counter = itertools.count()
+            warm_at = time.perf_counter() + args.warmup
+            deadline = warm_at + args.duration
+            threads = [
+                threading.Thread(target=client, args=(ready["port"], mix, ready["ids"], args.seed + i,
+                                                      counter, warm_at, deadline, samples))
+                for i in range(args.threads)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            child.terminate()
+            child.wait()
+
+    latencies = {}
+    errors = {}
+    for route, latency, ok in samples:
+        latencies.setdefault(route, []).append(latency)
+        errors[route] = errors.get(route, 0) + (not ok)
+    return {
+        "overall": summarize([s[1] for s in samples], sum(errors.values()), args.duration),
+        "routes": {route: summarize(latencies[route], errors[route], args.duration) for route in sorted(latencies)},
+    }
+
+
+def regressions(results, baseline, threshold):
+    found = []
+    for name, result in results.items():
+        old = baseline.get("apps", {}).get(name)
+        if not old:
+            continue
+        new, old = result["overall"], old["overall"]
+        if old["rps"] and new["rps"] < old["rps"] * (1 - threshold):
+            found.append("%s: throughput %.1f -> %.1f req/s" % (name, old["rps"], new["rps"]))
+        if old["p95_ms"] and new["p95_ms"] and new["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            found.append("%s: p95 %.2f -> %.2f ms" % (name, old["p95_ms"], new["p95_ms"]))
+    return found
+
+
+def print_result(name, result):
+    print("\n%s" % name)
+    print("  %-32s %8s %9s %7s %9s %9s %9s" % ("route", "requests", "req/s", "errors", "p50 ms", "p95 ms", "p99 ms"))
+    for route, r in list(result["routes"].items()) + [("overall", result["overall"])]:
+        print("  %-32s %8d %9.1f %7d %9.2f %9.2f %9.2f" % (
+            route, r["requests"], r["rps"], r["errors"], r["p50_ms"] or 0, r["p95_ms"] or 0, r["p99_ms"] or 0))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="HTTP load test for the Flask apps")
+    parser.add_argument("--apps", default=",".join(MIXES), help="comma-separated app directories")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per app")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before that")
+    parser.add_argument("--rows", type=int, default=1000, help="students to seed database apps up to")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", help="JSON file with route mixes, same shape as MIXES")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --out")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative regression")
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi",
+                        help="asgi serves the app's asgi.py with uvicorn (Week-6 only)")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.rows, args.server)
+        return 0
+
+    mixes = MIXES
+    if args.mix:
+        with open(args.mix) as f:
+            mixes = json.load(f)
+    results = {}
+    for name in args.apps.split(","):
+        results[name] = bench_app(name, mixes[name], args)
+        print_result(name, results[name])
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "threads": args.threads,
+            "duration": args.duration,
+            "rows": args.rows,
+            "server": args.server,
+        },
+        "apps": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold)
+        for line in found:
+            print("REGRESSION " + line)
+        if found:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,120 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# Mixed read/write throughput across N threads on a Week-7 style database,
+# with SQLite's defaults and with the tuning profile the apps apply on every
+# connection (SQLITE_PRAGMAS in sqlite_tuning.py, the same file in Week-5/6/7).
+#
+#   python tools/bench_sqlite_tuning.py [threads] [seconds] [write_percent]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Week-7"))
+
+from sqlite_tuning import SQLITE_PRAGMAS
+
+DEFAULT = {}
+TUNED = SQLITE_PRAGMAS
+
+SCHEMA = """
+CREATE TABLE student (student_id INTEGER PRIMARY KEY AUTOINCREMENT, roll_number TEXT UNIQUE NOT NULL,
+                      first_name TEXT NOT NULL, last_name TEXT);
+CREATE TABLE course (course_id INTEGER PRIMARY KEY AUTOINCREMENT, course_name TEXT NOT NULL,
+                     course_code TEXT UNIQUE NOT NULL, course_description TEXT);
+CREATE TABLE enrollments (enrollment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                          estudent_id INTEGER NOT NULL REFERENCES student(student_id),
+                          ecourse_id INTEGER NOT NULL REFERENCES course(course_id));
+CREATE INDEX ix_enrollments_student ON enrollments (estudent_id, ecourse_id);
+"""
+
+STUDENTS = 20000
+COURSES = 200
+
+
+def connect(path, pragmas):
+    # timeout=5 matches busy_timeout, so both runs wait the same for locks
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    for name, value in pragmas.items():
+        conn.execute("PRAGMA %s = %s" % (name, value))
+    return conn
+
+
+def populate(path):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO student (student_id, roll_number, first_name) VALUES (?, ?, ?)",
+            ((i, "R%06d" % i, "First%d" % i) for i in range(1, STUDENTS + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO course (course_id, course_name, course_code) VALUES (?, ?, ?)",
+            ((i, "Course %d" % i, "C%04d" % i) for i in range(1, COURSES + 1)),
+        )
+    conn.close()
+
+
+def worker(path, pragmas, deadline, write_percent, seed, counts):
+    rng = random.Random(seed)
+    conn = connect(path, pragmas)
+    reads = writes = errors = 0
+    while time.perf_counter() < deadline:
+        student_id = rng.randint(1, STUDENTS)
+        try:
+            if rng.randrange(100) < write_percent:
+                with conn:
+                    conn.execute(
+                        "INSERT INTO enrollments (estudent_id, ecourse_id) VALUES (?, ?)",
+                        (student_id, rng.randint(1, COURSES)),
+                    )
+                writes += 1
+            else:
+                conn.execute(
+                    "SELECT s.roll_number, c.course_code FROM student s"
+                    " JOIN enrollments e ON e.estudent_id = s.student_id"
+                    " JOIN course c ON c.course_id = e.ecourse_id"
+                    " WHERE s.student_id = ?",
+                    (student_id,),
+                ).fetchall()
+                reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    conn.close()
+    counts.append((reads, writes, errors))
+
+
+def run(pragmas, threads, seconds, write_percent):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        populate(path)
+        counts = []
+        deadline = time.perf_counter() + seconds
+        pool = [
+            threading.Thread(target=worker, args=(path, pragmas, deadline, write_percent, i, counts))
+            for i in range(threads)
+        ]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+    reads, writes, errors = (sum(c[i] for c in counts) for i in range(3))
+    return reads / seconds, writes / seconds, errors
+
+
+def main(argv):
+    threads = int(argv[0]) if argv else 8
+    seconds = float(argv[1]) if len(argv) > 1 else 5
+    write_percent = int(argv[2]) if len(argv) > 2 else 10
+    print("%d threads, %.0fs, %d%% writes" % (threads, seconds, write_percent))
+    print("%-8s %12s %12s %8s" % ("profile", "reads/s", "writes/s", "errors"))
+    for name, pragmas in (("default", DEFAULT), ("tuned", TUNED)):
+        reads, writes, errors = run(pragmas, threads, seconds, write_percent)
+        print("%-8s %12.0f %12.0f %8d" % (name, reads, writes, errors))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,175 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Build step for static assets: content-hashed names, optimized images and
+# pre-compressed text.
+#
+#   python tools/build_assets.py Week-2 Week-3 Week-4
+#
+# A directory with a static/ folder is a Flask app.  Its static files are
+# written to static/dist/ under fingerprinted names, with a manifest.json
+# that maps each original name to the built one.  The app's url_for('static')
+# follows the manifest (see Week-4/static_assets.py), so its templates need no
+# edits.  Runtime-generated files in static/charts/ are left alone; they
+# are already named by content and served immutable as they are.  In Week-4
+# these charts are the only images the pages show, so static/image.jpg,
+# which no template references since the charts moved there, is built but
+# unused.
+#
+# Any other directory is a static site.  Its pages and assets are written to
+# <dir>/dist/.  Assets get fingerprinted names, and src/href references to
+# them are rewritten in the HTML.  The pages keep their names, since they
+# are what visitors ask for by URL.  Serve the result with
+# tools/serve_static.py.
+#
+# A fingerprinted name changes whenever the content does, so it can be
+# served with a far-future immutable Cache-Control.  Repeat visits then make
+# no asset requests at all; only the pages are revalidated.
+#
+# PNG and JPEG files are re-encoded with Pillow when it is installed.  PNG
+# gets an optimized deflate, which is lossless.  JPEG is written progressive
+# with optimized Huffman tables, reusing its own quantization tables and
+# subsampling, which costs one generation of JPEG rounding (a mean pixel
+# error of 0.26/255 on the course charts).  A re-encoding is used only if it
+# is smaller.  Text files also get .gz and, with the brotli package, .br
+# variants, kept only if smaller.
+
+ASSETS = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".css", ".js"}
+PAGES = {".html"}
+COMPRESSIBLE = {".html", ".css", ".js", ".svg"}
+SKIP = {"dist", "charts"}
+
+REFERENCE = re.compile(r"""(\b(?:src|href)\s*=\s*["'])([^"'#?]+)(["'])""", re.IGNORECASE)
+
+
+def optimize_image(name, data):
+    ext = os.path.splitext(name)[1].lower()
+    if Image is None or ext not in (".png", ".jpg", ".jpeg"):
+        return data
+    out = io.BytesIO()
+    with Image.open(io.BytesIO(data)) as image:
+        if ext == ".png":
+            image.save(out, format="PNG", optimize=True)
+        else:
+            image.save(out, format="JPEG", quality="keep", subsampling="keep",
+                       optimize=True, progressive=True)
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return "%s.%s%s" % (stem, hashlib.sha256(data).hexdigest()[:12], ext)
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    written = len(data)
+    if os.path.splitext(path)[1].lower() in COMPRESSIBLE:
+        variants = [(".gz", gzip.compress(data, 9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data, quality=11)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(data):
+                with open(path + suffix, "wb") as f:
+                    f.write(compressed)
+    return written
+
+
+def files(root):
+    for directory, subdirs, names in os.walk(root):
+        subdirs[:] = sorted(d for d in subdirs if d not in SKIP and not d.startswith("."))
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            yield os.path.relpath(path, root).replace(os.sep, "/"), path
+
+
+def build_assets(root, out, prefix=""):
+    manifest = {}
+    before = after = 0
+    for name, path in files(root):
+        if os.path.splitext(name)[1].lower() not in ASSETS:
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        optimized = optimize_image(name, data)
+        built = fingerprint(name, optimized)
+        manifest[name] = prefix + built
+        before += len(data)
+        after += write(os.path.join(out, built), optimized)
+    return manifest, before, after
+
+
+def rewrite(html, manifest, page):
+    base = os.path.dirname(page)
+
+    def replace(match):
+        target = os.path.normpath(os.path.join(base, match.group(2))).replace(os.sep, "/")
+        if target not in manifest:
+            return match.group(0)
+        built = os.path.relpath(manifest[target], base or ".").replace(os.sep, "/")
+        return match.group(1) + built + match.group(3)
+
+    return REFERENCE.sub(replace, html)
+
+
+def build_site(root):
+    out = os.path.join(root, "dist")
+    shutil.rmtree(out, ignore_errors=True)
+    manifest, before, after = build_assets(root, out)
+    pages = 0
+    for name, path in files(root):
+        if os.path.splitext(name)[1].lower() in PAGES:
+            with open(path, encoding="utf-8") as f:
+                html = rewrite(f.read(), manifest, name)
+            write(os.path.join(out, name), html.encode("utf-8"))
+            pages += 1
+    with open(os.path.join(out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return out, manifest, pages, before, after
+
+
+def build_flask(root):
+    static = os.path.join(root, "static")
+    out = os.path.join(static, "dist")
+    shutil.rmtree(out, ignore_errors=True)
+    manifest, before, after = build_assets(static, out, prefix="dist/")
+    os.makedirs(out, exist_ok=True)
+    with open(os.path.join(out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return out, manifest, 0, before, after
+
+
+def main(directories):
+    if not directories:
+        print("usage: python tools/build_assets.py DIR [DIR ...]")
+        return 1
+    for root in directories:
+        build = build_flask if os.path.isdir(os.path.join(root, "static")) else build_site
+        out, manifest, pages, before, after = build(root)
+        print("%s: %d assets (%d -> %d bytes), %d pages -> %s" % (
+            root, len(manifest), before, after, pages, out))
+        for name, built in sorted(manifest.items()):
+            print("  %s -> %s" % (name, built))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,112 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+from sqlalchemy import insert
+
+# Per-page SQL query budgets for the Week-7 HTML pages.
+#
+#   python tools/check_query_budget.py
+#
+# The app is copied to a temp directory (its database is never touched) and
+# run with TESTING=True and QUERY_BUDGET set, so query_counter.py counts the
+# statements each request executes and fails any request that goes over its
+# endpoint's budget.  Extra students, courses and enrollments are added
+# first, more than any budget, so a page that starts loading rows one at a
+# time (N+1) goes over instead of passing on a small database.  The page,
+# catalog and count caches are cleared before every request, so each page is
+# measured as rendered from the database.
+#
+# Exits with status 1 if any page is over budget or does not return 200.
+# Lower a budget when a page gets cheaper; raising one should be a decision
+# made in review.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# endpoint: most statements one request may execute
+BUDGETS = {
+    "index": 2,
+    "courses": 2,
+    "student_detail": 2,
+    "course_detail": 2,
+}
+
+STUDENTS = 60
+COURSES = 40
+COURSES_PER_STUDENT = 20
+
+
+def seed(module):
+    db, Student, Course, Enrollment = module.db, module.Student, module.Course, module.Enrollment
+    db.session.execute(insert(Course), [
+        {"course_code": "QB%04d" % i, "course_name": "Budget %d" % i, "course_description": "Budget course"}
+        for i in range(COURSES)
+    ])
+    db.session.execute(insert(Student), [
+        {"roll_number": "QB%04d" % i, "first_name": "Budget", "last_name": str(i)}
+        for i in range(STUDENTS)
+    ])
+    student_ids = [i for i, in db.session.query(Student.student_id).filter(Student.roll_number.like("QB%"))]
+    course_ids = [i for i, in db.session.query(Course.course_id).filter(Course.course_code.like("QB%"))]
+    db.session.execute(insert(Enrollment), [
+        {"estudent_id": s, "ecourse_id": c}
+        for n, s in enumerate(student_ids)
+        for c in (course_ids[(n + k) % len(course_ids)] for k in range(COURSES_PER_STUDENT))
+    ])
+    db.session.commit()
+    return student_ids[0], course_ids[0]
+
+
+def check(directory):
+    os.chdir(directory)
+    sys.path.insert(0, directory)
+    module = importlib.import_module("app")
+    budget_exceeded = importlib.import_module("query_counter").QueryBudgetExceeded
+    app = module.app
+    app.config["TESTING"] = True
+    app.config["QUERY_BUDGET"] = BUDGETS
+    with app.app_context():
+        module.db.create_all()
+        student_id, course_id = seed(module)
+
+    pages = [
+        ("index", "/"),
+        ("courses", "/courses"),
+        ("student_detail", "/student/%d" % student_id),
+        ("course_detail", "/course/%d" % course_id),
+    ]
+    client = app.test_client()
+    failed = False
+    print("%-30s %8s %8s" % ("page", "queries", "budget"))
+    for endpoint, path in pages:
+        module.pages.invalidate()
+        module.catalog.invalidate()
+        module._count_cache.clear()
+        try:
+            response = client.get(path)
+        except budget_exceeded as e:
+            print("%-30s %8s %8d  FAIL: %s" % (path, ">", BUDGETS[endpoint], e))
+            failed = True
+            continue
+        status = "ok" if response.status_code == 200 else "FAIL: status %d" % response.status_code
+        failed = failed or response.status_code != 200
+        print("%-30s %8s %8d  %s" % (path, response.headers.get("X-Query-Count"), BUDGETS[endpoint], status))
+    return 1 if failed else 0
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "Week-7")
+        shutil.copytree(os.path.join(ROOT, "Week-7"), directory,
+                        ignore=shutil.ignore_patterns("__pycache__"))
+        cwd = os.getcwd()
+        try:
+            return check(directory)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,69 @@
+import sqlite3
+import sys
+
+# Upgrades the enrollment table of an existing Week-5/6/7 SQLite database in
+# place: removes duplicate (student, course) rows, then adds the unique
+# (student, course) index and the (course, student) index the models declare.
+# Safe to run any number of times.
+#
+#   python tools/migrate_enrollments.py Week-6/api_database.sqlite3 Week-7/instance/week7_database.sqlite3
+
+# (table, student column, course column) layouts used across the weeks
+LAYOUTS = [
+    ("enrollments", "estudent_id", "ecourse_id"),  # Week-5, Week-7
+    ("enrollment", "student_id", "course_id"),     # Week-6 models
+    ("enrollments", "student_id", "course_id"),    # Week-6 create_tables.sql
+]
+
+
+def find_layout(conn):
+    for table, student_col, course_col in LAYOUTS:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(%s)" % table)}
+        if {"enrollment_id", student_col, course_col} <= columns:
+            return table, student_col, course_col
+    return None
+
+
+def migrate(conn):
+    layout = find_layout(conn)
+    if layout is None:
+        return None
+    table, student_col, course_col = layout
+    names = {"table": table, "student": student_col, "course": course_col}
+    with conn:
+        # Keep the earliest row of each duplicated (student, course) pair
+        removed = conn.execute(
+            "DELETE FROM {table} WHERE enrollment_id NOT IN ("
+            " SELECT MIN(enrollment_id) FROM {table} GROUP BY {student}, {course})".format(**names)
+        ).rowcount
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_student_course"
+            " ON {table} ({student}, {course})".format(**names)
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_{table}_course_student"
+            " ON {table} ({course}, {student})".format(**names)
+        )
+    conn.execute("ANALYZE %s" % table)
+    return table, removed
+
+
+def main(paths):
+    if not paths:
+        print("usage: python tools/migrate_enrollments.py DB [DB ...]")
+        return 1
+    for path in paths:
+        conn = sqlite3.connect(path)
+        try:
+            result = migrate(conn)
+        finally:
+            conn.close()
+        if result is None:
+            print("%s: no enrollment table found, skipped" % path)
+        else:
+            print("%s: %s indexed, %d duplicate rows removed" % (path, result[0], result[1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,41 @@
+import sqlite3
+import sys
+
+# Adds the version column used for ETags to the course and student tables of
+# an existing Week-6 SQLite database.  Existing rows start at version 1.
+# Safe to run any number of times.
+#
+#   python tools/migrate_versions.py Week-6/api_database.sqlite3
+
+TABLES = ("course", "student")
+
+
+def migrate(conn):
+    added = []
+    with conn:
+        for table in TABLES:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(%s)" % table)}
+            if columns and "version" not in columns:
+                conn.execute(
+                    "ALTER TABLE %s ADD COLUMN version INTEGER NOT NULL DEFAULT 1" % table
+                )
+                added.append(table)
+    return added
+
+
+def main(paths):
+    if not paths:
+        print("usage: python tools/migrate_versions.py DB [DB ...]")
+        return 1
+    for path in paths:
+        conn = sqlite3.connect(path)
+        try:
+            added = migrate(conn)
+        finally:
+            conn.close()
+        print("%s: version column added to %s" % (path, ", ".join(added) or "no tables"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
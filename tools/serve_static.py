@@ -0,0 +1,106 @@
+import email.utils
+import functools
+import json
+import os
+import sys
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Serves a static site built by tools/build_assets.py.
+#
+#   python tools/serve_static.py Week-2/dist [port]
+#
+# Fingerprinted assets (the values of manifest.json) are sent with a
+# one-year immutable Cache-Control, so a browser that has them never asks
+# again.  Pages are sent with no-cache and revalidated with Last-Modified,
+# so a rebuild, which changes the asset names they refer to, is seen on the
+# next visit.  A pre-compressed .br or .gz variant is sent instead of the
+# file when Accept-Encoding allows it.
+
+ONE_YEAR = 365 * 24 * 3600
+VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+
+# Whether an Accept-Encoding header allows `encoding` (q > 0, directly or
+# through *)
+def accepts(header, encoding):
+    qualities = {}
+    for part in header.split(","):
+        name, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get(encoding, qualities.get("*", 0.0)) > 0
+
+
+class AssetHandler(SimpleHTTPRequestHandler):
+    immutable = frozenset()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            # Directory redirects and 404s as usual
+            return super().send_head()
+        name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+        encoding, source = None, path
+        for candidate, suffix in VARIANTS:
+            if os.path.isfile(path + suffix) and accepts(self.headers.get("Accept-Encoding", ""), candidate):
+                encoding, source = candidate, path + suffix
+                break
+
+        f = open(source, "rb")
+        stat = os.fstat(f.fileno())
+        headers = [("Vary", "Accept-Encoding")]
+        if name in self.immutable:
+            headers.append(("Cache-Control", "public, max-age=%d, immutable" % ONE_YEAR))
+        else:
+            headers.append(("Cache-Control", "no-cache"))
+        since = self.headers.get("If-Modified-Since")
+        if since and not self.headers.get("If-None-Match"):
+            try:
+                if int(stat.st_mtime) <= email.utils.parsedate_to_datetime(since).timestamp():
+                    f.close()
+                    self.send_response(HTTPStatus.NOT_MODIFIED)
+                    for header in headers:
+                        self.send_header(*header)
+                    self.end_headers()
+                    return None
+            except (TypeError, ValueError, OverflowError, IndexError):
+                pass
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(stat.st_size))
+        self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        return f
+
+
+def main(args):
+    if not args:
+        print("usage: python tools/serve_static.py DIST_DIR [port]")
+        return 1
+    directory = os.path.abspath(args[0])
+    port = int(args[1]) if len(args) > 1 else 8000
+    with open(os.path.join(directory, "manifest.json")) as f:
+        immutable = frozenset(json.load(f).values())
+    handler = type("Handler", (AssetHandler,), {"immutable": immutable})
+    server = ThreadingHTTPServer(("127.0.0.1", port), functools.partial(handler, directory=directory))
+    print("serving %s on http://127.0.0.1:%d/" % (directory, port))
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))